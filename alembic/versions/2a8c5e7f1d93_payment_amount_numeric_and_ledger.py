@@ -0,0 +1,71 @@
+"""Make payment_amount numeric and add payment ledger tables
+
+Revision ID: 2a8c5e7f1d93
+Revises: 9e6b2f4d8a17
+Create Date: 2026-10-18 15:47:12.680354
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2a8c5e7f1d93'
+down_revision: Union[str, None] = '9e6b2f4d8a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('payments', 'payment_amount',
+                    existing_type=sa.Float(),
+                    type_=sa.Numeric(12, 2),
+                    existing_nullable=False,
+                    postgresql_using='round(payment_amount::numeric, 2)')
+
+    op.create_table(
+        'payment_monthly',
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('total_amount', sa.Numeric(14, 2), server_default='0', nullable=False),
+        sa.Column('payments_count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('month')
+    )
+    op.create_table(
+        'payment_student_totals',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('total_amount', sa.Numeric(14, 2), server_default='0', nullable=False),
+        sa.Column('payments_count', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id')
+    )
+
+    # Mavjud to'lovlardan boshlang'ich to'ldirish (keyinchalik: python -m app.db.ledger rebuild)
+    op.execute(
+        """
+        INSERT INTO payment_monthly (month, total_amount, payments_count)
+        SELECT date_trunc('month', payment_date)::date, sum(payment_amount), count(*)
+        FROM payments
+        GROUP BY 1
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO payment_student_totals (student_id, total_amount, payments_count)
+        SELECT student_id, sum(payment_amount), count(*)
+        FROM payments
+        GROUP BY student_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('payment_student_totals')
+    op.drop_table('payment_monthly')
+    op.alter_column('payments', 'payment_amount',
+                    existing_type=sa.Numeric(12, 2),
+                    type_=sa.Float(),
+                    existing_nullable=False)
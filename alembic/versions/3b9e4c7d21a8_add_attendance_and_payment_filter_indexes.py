@@ -0,0 +1,36 @@
+"""Add attendance and payment filter indexes
+
+Revision ID: 3b9e4c7d21a8
+Revises: 5ed0d7a1535e
+Create Date: 2026-10-18 09:12:40.114305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e4c7d21a8'
+down_revision: Union[str, None] = '5ed0d7a1535e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_attendance_group_id_attendance_date', 'attendance', ['group_id', 'attendance_date'])
+    op.create_index('ix_attendance_student_id_attendance_date', 'attendance', ['student_id', 'attendance_date'])
+    op.create_index('ix_attendance_teacher_id_attendance_date', 'attendance', ['teacher_id', 'attendance_date'])
+    op.create_index('ix_payments_student_id_payment_date', 'payments', ['student_id', 'payment_date'])
+    op.create_index('ix_payments_payment_date', 'payments', ['payment_date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_payments_payment_date', table_name='payments')
+    op.drop_index('ix_payments_student_id_payment_date', table_name='payments')
+    op.drop_index('ix_attendance_teacher_id_attendance_date', table_name='attendance')
+    op.drop_index('ix_attendance_student_id_attendance_date', table_name='attendance')
+    op.drop_index('ix_attendance_group_id_attendance_date', table_name='attendance')
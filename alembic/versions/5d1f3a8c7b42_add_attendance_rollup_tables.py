@@ -0,0 +1,86 @@
+"""Add attendance rollup tables
+
+Revision ID: 5d1f3a8c7b42
+Revises: c4a7e91b2d60
+Create Date: 2026-10-18 14:22:51.903174
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1f3a8c7b42'
+down_revision: Union[str, None] = 'c4a7e91b2d60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'attendance_group_daily',
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('teacher_id', sa.Integer(), nullable=False),
+        sa.Column('attendance_date', sa.Date(), nullable=False),
+        sa.Column('present', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('absent', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('late', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['teacher_id'], ['teachers.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('group_id', 'teacher_id', 'attendance_date')
+    )
+    op.create_index('ix_attendance_group_daily_teacher_id_attendance_date', 'attendance_group_daily',
+                    ['teacher_id', 'attendance_date'], unique=False)
+    op.create_index('ix_attendance_group_daily_attendance_date', 'attendance_group_daily',
+                    ['attendance_date'], unique=False)
+
+    op.create_table(
+        'attendance_student_daily',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('attendance_date', sa.Date(), nullable=False),
+        sa.Column('present', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('absent', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('late', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id', 'attendance_date')
+    )
+    op.create_index('ix_attendance_student_daily_attendance_date', 'attendance_student_daily',
+                    ['attendance_date'], unique=False)
+
+    # Mavjud davomat bo'yicha boshlang'ich to'ldirish (keyinchalik: python -m app.db.rollups rebuild)
+    op.execute(
+        """
+        INSERT INTO attendance_group_daily (group_id, teacher_id, attendance_date, present, absent, late)
+        SELECT group_id, teacher_id, attendance_date,
+               count(*) FILTER (WHERE status = 'present'),
+               count(*) FILTER (WHERE status = 'absent'),
+               count(*) FILTER (WHERE status = 'late')
+        FROM attendance
+        WHERE group_id IS NOT NULL AND teacher_id IS NOT NULL AND attendance_date IS NOT NULL
+        GROUP BY group_id, teacher_id, attendance_date
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO attendance_student_daily (student_id, attendance_date, present, absent, late)
+        SELECT student_id, attendance_date,
+               count(*) FILTER (WHERE status = 'present'),
+               count(*) FILTER (WHERE status = 'absent'),
+               count(*) FILTER (WHERE status = 'late')
+        FROM attendance
+        WHERE student_id IS NOT NULL AND attendance_date IS NOT NULL
+        GROUP BY student_id, attendance_date
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_attendance_student_daily_attendance_date', table_name='attendance_student_daily')
+    op.drop_table('attendance_student_daily')
+    op.drop_index('ix_attendance_group_daily_attendance_date', table_name='attendance_group_daily')
+    op.drop_index('ix_attendance_group_daily_teacher_id_attendance_date', table_name='attendance_group_daily')
+    op.drop_table('attendance_group_daily')
@@ -0,0 +1,72 @@
+"""Add pg_trgm search indexes over student and teacher names and phones
+
+Revision ID: 7c3e9a1f5b26
+Revises: 2a8c5e7f1d93
+Create Date: 2026-10-18 16:31:44.125078
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e9a1f5b26'
+down_revision: Union[str, None] = '2a8c5e7f1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # app/core/text.py fold_uz bilan bir xil: lower + kirill -> lotin + tutuq belgilarini olib tashlash.
+    # Indeks ifodasida ishlatilgani uchun IMMUTABLE
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION uz_fold(value text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $$
+            SELECT translate(
+                replace(replace(replace(replace(replace(replace(replace(replace(
+                    lower(value),
+                    'ё', 'yo'), 'ю', 'yu'), 'я', 'ya'), 'ц', 'ts'),
+                    'ч', 'ch'), 'щ', 'sh'), 'ш', 'sh'), 'ж', 'j'),
+                'абвгдезийклмнопрстуфхэўқғҳъь''ʻʼ’‘`',
+                'abvgdeziyklmnoprstufxeoqgh'
+            )
+        $$
+        """
+    )
+
+    op.execute(
+        "CREATE INDEX ix_students_name_trgm ON students "
+        "USING gin (uz_fold(student_firstname || ' ' || student_lastname) gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_students_phone_trgm ON students "
+        "USING gin (regexp_replace(student_phone_number, '\\D', '', 'g') gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_students_parents_phone_trgm ON students "
+        "USING gin (regexp_replace(student_parents_phone_number, '\\D', '', 'g') gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_teachers_name_trgm ON teachers "
+        "USING gin (uz_fold(teacher_firstname || ' ' || teacher_lastname) gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_teachers_phone_trgm ON teachers "
+        "USING gin (regexp_replace(teacher_phone_number, '\\D', '', 'g') gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_teachers_phone_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_teachers_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_students_parents_phone_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_students_phone_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_students_name_trgm")
+    op.execute("DROP FUNCTION IF EXISTS uz_fold(text)")
@@ -0,0 +1,40 @@
+"""Add unique attendance key on student, group and date
+
+Revision ID: 8f2d6a0c5e13
+Revises: 3b9e4c7d21a8
+Create Date: 2026-10-18 10:03:15.482917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2d6a0c5e13'
+down_revision: Union[str, None] = '3b9e4c7d21a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Poyga holati tufayli paydo bo'lgan takroriy yozuvlardan faqat eng birinchisi qoldiriladi
+    op.execute(
+        """
+        DELETE FROM attendance a
+        USING attendance b
+        WHERE a.student_id = b.student_id
+          AND a.group_id = b.group_id
+          AND a.attendance_date = b.attendance_date
+          AND a.id > b.id
+        """
+    )
+    op.create_index('uq_attendance_student_group_date', 'attendance',
+                    ['student_id', 'group_id', 'attendance_date'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_attendance_student_group_date', table_name='attendance')
@@ -0,0 +1,61 @@
+"""Add attendance_streaks table
+
+Revision ID: 9e6b2f4d8a17
+Revises: 5d1f3a8c7b42
+Create Date: 2026-10-18 15:08:36.417920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e6b2f4d8a17'
+down_revision: Union[str, None] = '5d1f3a8c7b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'attendance_streaks',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('current_absences', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_attendance_date', sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id', 'group_id')
+    )
+    op.create_index('ix_attendance_streaks_current_absences', 'attendance_streaks',
+                    ['current_absences'], unique=False)
+
+    # Mavjud davomatdan boshlang'ich streak'lar (app/db/analytics.py streak_select bilan bir xil)
+    op.execute(
+        """
+        INSERT INTO attendance_streaks (student_id, group_id, current_absences, last_attendance_date)
+        SELECT student_id, group_id,
+               count(*) FILTER (WHERE attended_after = 0),
+               max(attendance_date)
+        FROM (
+            SELECT student_id, group_id, attendance_date,
+                   sum(CASE WHEN status <> 'absent' THEN 1 ELSE 0 END) OVER (
+                       PARTITION BY student_id, group_id
+                       ORDER BY attendance_date DESC
+                       ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                   ) AS attended_after
+            FROM attendance
+            WHERE student_id IS NOT NULL AND group_id IS NOT NULL AND attendance_date IS NOT NULL
+        ) ordered
+        GROUP BY student_id, group_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_attendance_streaks_current_absences', table_name='attendance_streaks')
+    op.drop_table('attendance_streaks')
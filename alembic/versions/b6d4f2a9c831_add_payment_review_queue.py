@@ -0,0 +1,41 @@
+"""Add payment review queue for unmatched bank statement lines
+
+Revision ID: b6d4f2a9c831
+Revises: 7c3e9a1f5b26
+Create Date: 2026-10-18 17:12:40.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d4f2a9c831'
+down_revision: Union[str, None] = '7c3e9a1f5b26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'payment_review_queue',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('payment_date', sa.Date(), nullable=False),
+        sa.Column('payment_amount', sa.Numeric(12, 2), nullable=False),
+        sa.Column('payer_name', sa.String(), nullable=True),
+        sa.Column('payer_phone', sa.String(), nullable=True),
+        sa.Column('purpose', sa.String(), nullable=True),
+        sa.Column('reason', sa.String(), nullable=False),
+        sa.Column('candidate_ids', postgresql.ARRAY(sa.Integer()), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('payment_review_queue')
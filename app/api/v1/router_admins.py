@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from app.core.config import settings
+from app.db.session import DbSession, get_session, run_db
 from app.db.crud import (
     create_admin,
     get_admins,
@@ -9,31 +9,33 @@ from app.db.crud import (
     update_admin,
     delete_admin
 )
-from app.db.schemas import AdminCreate, AdminOutput, AdminDetail, AdminUpdate
+from app.db.schemas import AdminCreate, Page, AdminOutput, AdminDetail, AdminUpdate
 
 admin_router = APIRouter()
 
 
-@admin_router.post("/admins")
-def add_admin(data: AdminCreate, db: Session = Depends(get_db)):
-    return create_admin(db, data)
+@admin_router.post("/admins", response_model=AdminDetail)
+async def add_admin(data: AdminCreate, db: DbSession = Depends(get_session)):
+    return await run_db(db, create_admin, data, schema=AdminDetail)
 
 
-@admin_router.get("/admins", response_model=List[AdminOutput])
-def read_admins(db: Session = Depends(get_db)):
-    return get_admins(db)
+@admin_router.get("/admins", response_model=Page[AdminOutput])
+async def read_admins(limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                      after: Optional[int] = None,
+                      db: DbSession = Depends(get_session)):
+    return await run_db(db, get_admins, limit, after, AdminOutput, schema=Page[AdminOutput])
 
 
 @admin_router.get("/admins/{admin_id}", response_model=AdminDetail)
-def read_admin(admin_id: int, db: Session = Depends(get_db)):
-    return get_admin(db, admin_id)
+async def read_admin(admin_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, get_admin, admin_id, schema=AdminDetail)
 
 
-@admin_router.put("/admins/{admin_id}")
-def modify_admin(admin_id: int, data_update: AdminUpdate, db: Session = Depends(get_db)):
-    return update_admin(db, admin_id, data_update)
+@admin_router.put("/admins/{admin_id}", response_model=AdminDetail)
+async def modify_admin(admin_id: int, data_update: AdminUpdate, db: DbSession = Depends(get_session)):
+    return await run_db(db, update_admin, admin_id, data_update, schema=AdminDetail)
 
 
-@admin_router.delete("/admins/{admin_id}")
-def remove_admin(admin_id: int, db: Session = Depends(get_db)):
-    return delete_admin(db, admin_id)
+@admin_router.delete("/admins/{admin_id}", response_model=AdminDetail)
+async def remove_admin(admin_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, delete_admin, admin_id, schema=AdminDetail)
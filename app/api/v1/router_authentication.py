@@ -1,16 +1,16 @@
 from datetime import timedelta
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from jose import JWTError
 import logging
 import jwt
-from sqlalchemy.orm import Session
 
-from app.core.register import register, login, logout
-from app.core.security import create_access_token
-from app.db.models import User
-from app.db.schemas import UserCreate, UserOutput, Token, UserLogin
-from app.db.session import get_db
+from app.core.register import register, login, logout, refresh
+from app.core.security import create_access_token, oauth2_scheme
+from app.core.utils import get_user_by_email
+from app.db.schemas import UserCreate, UserOutput, Token, TokenRefreshRequest, UserLogin
+from app.db.session import DbSession, get_session, run_db
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,21 +18,27 @@ logger = logging.getLogger(__name__)
 authentication_router = APIRouter()
 
 @authentication_router.post("/register", response_model=UserOutput)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    return register(user, db)
+async def register_user(user: UserCreate, db: DbSession = Depends(get_session)):
+    return await register(user, db)
 
 @authentication_router.post("/login", response_model=Token)
-def login_user(data: UserLogin, db: Session = Depends(get_db)):
-    return login(data, db)
+async def login_user(data: UserLogin, background_tasks: BackgroundTasks, db: DbSession = Depends(get_session)):
+    return await login(data, db, background_tasks)
+
+@authentication_router.post("/refresh", response_model=Token)
+async def refresh_access_token(data: TokenRefreshRequest, db: DbSession = Depends(get_session)):
+    return await run_db(db, lambda session: refresh(data.refresh_token, session))
 
 @authentication_router.post("/logout")
-def logout_user():
-    return logout()
+async def logout_user(data: Optional[TokenRefreshRequest] = None, token: str = Depends(oauth2_scheme),
+                      db: DbSession = Depends(get_session)):
+    refresh_token = data.refresh_token if data else None
+    return await run_db(db, lambda session: logout(token, refresh_token, session))
 
 
 @authentication_router.post("/reset-password")
-def request_password_reset(email: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.user_email == email).first()
+async def request_password_reset(email: str, db: DbSession = Depends(get_session)):
+    user = await run_db(db, lambda session: get_user_by_email(email, session))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
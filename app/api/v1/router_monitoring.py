@@ -0,0 +1,23 @@
+from anyio import to_thread
+from fastapi import APIRouter
+
+from app.core.security import password_hasher
+from app.db.pool import pool_stats, pool_status
+from app.db.session import engine, async_engine
+
+monitoring_router = APIRouter()
+
+
+@monitoring_router.get("/monitoring/db-pool", response_model=dict)
+async def read_db_pool_stats():
+    limiter = to_thread.current_default_thread_limiter()
+    active_engine = async_engine.sync_engine if async_engine is not None else engine
+    return {
+        "pool": pool_status(active_engine.pool),
+        "checkout": pool_stats.snapshot(),
+        "threadpool": {
+            "total_tokens": limiter.total_tokens,
+            "borrowed_tokens": limiter.borrowed_tokens,
+        },
+        "password_hashing": password_hasher.snapshot(),
+    }
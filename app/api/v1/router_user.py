@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from app.core.config import settings
+from app.db.session import DbSession, get_session, run_db
 from app.db.crud import (
     create_user,
     get_users,
@@ -9,31 +9,33 @@ from app.db.crud import (
     update_user,
     delete_user
 )
-from app.db.schemas import UserCreate, UserOutput, UserDetail, UserUpdate
+from app.db.schemas import UserCreate, Page, UserOutput, UserDetail, UserUpdate
 
 user_router = APIRouter()
 
 
 # @user_router.post("/users", response_model=dict)
-# def add_user(data: UserCreate, db: Session = Depends(get_db)):
-#     return create_user(db, data)
+# def add_user(data: UserCreate, db: DbSession = Depends(get_session)):
+#     return await run_db(db, create_user, data)
 
 
-@user_router.get("/users", response_model=List[UserOutput])
-def read_users(db: Session = Depends(get_db)):
-    return get_users(db)
+@user_router.get("/users", response_model=Page[UserOutput])
+async def read_users(limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                     after: Optional[int] = None,
+                     db: DbSession = Depends(get_session)):
+    return await run_db(db, get_users, limit, after, UserOutput, schema=Page[UserOutput])
 
 
 @user_router.get("/users/{user_id}", response_model=UserDetail)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    return get_user(db, user_id)
+async def read_user(user_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, get_user, user_id, schema=UserDetail)
 
 
-@user_router.put("/users/{user_id}")
-def modify_user(user_id: int, data_update: UserUpdate, db: Session = Depends(get_db)):
-    return update_user(db, user_id, data_update)
+@user_router.put("/users/{user_id}", response_model=UserOutput)
+async def modify_user(user_id: int, data_update: UserUpdate, db: DbSession = Depends(get_session)):
+    return await run_db(db, update_user, user_id, data_update, schema=UserOutput)
 
 
-@user_router.delete("/users/{user_id}")
-def remove_user(user_id: int, db: Session = Depends(get_db)):
-    return delete_user(db, user_id)
+@user_router.delete("/users/{user_id}", response_model=UserOutput)
+async def remove_user(user_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, delete_user, user_id, schema=UserOutput)
@@ -1,37 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import Optional
+from datetime import date
+from app.core.conditional import conditional_response
+from app.core.config import settings
+from app.db.models import Attendance, Groups, Students
+from app.db.session import DbSession, get_session, run_db
 from app.db.crud import (
     create_attendance,
+    correct_attendance,
     get_attendances,
     get_attendance,
     update_attendance,
-    delete_attendance)
+    delete_attendance,
+    get_list_version,
+    get_attendance_version,
+    attendance_filters)
 
-from app.db.schemas import AttendanceCreate, AttendanceDetail, AttendanceBase, AttendanceUpdate, AttendancesOutput
+from app.db.schemas import (
+    AttendanceCreate,
+    AttendanceDetail,
+    AttendanceRecord,
+    AttendanceBase,
+    AttendanceUpdate,
+    AttendancesOutput,
+    AttendanceFilter,
+    AttendanceCorrection,
+    Page)
+from app.enums import SortOrderEnum
 
 attendance_router = APIRouter()
 
 @attendance_router.post("/attendances", response_model=dict)
-def add_attendance(data: AttendanceCreate, db: Session = Depends(get_db)):
-    return create_attendance(db, data)
+async def add_attendance(data: AttendanceCreate, db: DbSession = Depends(get_session)):
+    return await run_db(db, create_attendance, data)
 
-@attendance_router.get("/attendances", response_model=List[AttendancesOutput])
-def read_attendances(db: Session = Depends(get_db)):
-    return get_attendances(db)
+@attendance_router.get("/attendances", response_model=Page[AttendancesOutput])
+async def read_attendances(request: Request, response: Response,
+                           limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                           after: Optional[int] = None,
+                           sort: SortOrderEnum = SortOrderEnum.asc,
+                           filters: AttendanceFilter = Depends(),
+                           db: DbSession = Depends(get_session)):
+    not_modified = conditional_response(request, response, await run_db(
+        db, get_list_version, Attendance, limit, after, sort == SortOrderEnum.desc, attendance_filters(filters),
+        [(Students, Attendance.student_id), (Groups, Attendance.group_id)]))
+    if not_modified is not None:
+        return not_modified
+    return await run_db(db, get_attendances, limit, after, filters, sort == SortOrderEnum.desc, AttendancesOutput,
+                        schema=Page[AttendancesOutput])
 
 @attendance_router.get("/attendances/{attendance_id}", response_model=AttendanceDetail)
-def read_attendance(attendance_id: int, db: Session = Depends(get_db)):
-    attendance = get_attendance(db, attendance_id)
+async def read_attendance(attendance_id: int, request: Request, response: Response,
+                          db: DbSession = Depends(get_session)):
+    not_modified = conditional_response(request, response, await run_db(db, get_attendance_version, attendance_id))
+    if not_modified is not None:
+        return not_modified
+    attendance = await run_db(db, get_attendance, attendance_id, schema=AttendanceDetail)
     if not attendance:
         raise HTTPException(status_code=404, detail="Attendance not found")
     return attendance
 
-@attendance_router.put("/attendances/{attendance_id}")
-def modify_attendance(data: AttendanceUpdate, attendance_id: int, db: Session = Depends(get_db)):
-    return update_attendance(db, attendance_id, data)
+@attendance_router.put("/attendances/groups/{group_id}/{attendance_date}", response_model=dict)
+async def modify_group_attendance(group_id: int, attendance_date: date, data: AttendanceCorrection,
+                                  db: DbSession = Depends(get_session)):
+    return await run_db(db, correct_attendance, group_id, attendance_date, data)
 
-@attendance_router.delete("/attendances/{attendance_id}")
-def remove_attendance(attendance_id: int, db: Session = Depends(get_db)):
-    return delete_attendance(db, attendance_id)
+@attendance_router.put("/attendances/{attendance_id}", response_model=AttendanceRecord)
+async def modify_attendance(data: AttendanceUpdate, attendance_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, update_attendance, attendance_id, data, schema=AttendanceRecord)
+
+@attendance_router.delete("/attendances/{attendance_id}", response_model=AttendanceRecord)
+async def remove_attendance(attendance_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, delete_attendance, attendance_id, schema=AttendanceRecord)
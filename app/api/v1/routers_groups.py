@@ -1,39 +1,68 @@
 from http.client import HTTPException
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.session import get_db
-from app.db.schemas import GroupBase, GroupDetail, GroupUpdate, GroupCreate, GroupOutput
+from fastapi import APIRouter, Depends, Query, Request, Response
+from typing import List, Optional
+from app.core.conditional import cached_conditional, conditional_response
+from app.core.config import settings
+from app.db.batch import GROUP_BATCH, create_batch, update_batch
+from app.db.models import Groups
+from app.db.session import DbSession, get_session, run_db
+from app.db.schemas import GroupBase, GroupDetail, GroupRecord, GroupUpdate, GroupCreate, GroupOutput, GroupBatchUpdate, BatchResult, Page
+from app.enums import BatchModeEnum
 from app.db.crud import (
     create_group,
     get_groups,
     get_group,
     update_group,
-    delete_group)
+    delete_group,
+    get_list_version,
+    get_group_version)
 
 groups_router = APIRouter()
 
 
-@groups_router.post("/groups")
-def add_groups(data: GroupCreate, db: Session = Depends(get_db)):
-    return create_group(db, data)
+@groups_router.post("/groups", response_model=GroupRecord)
+async def add_groups(data: GroupCreate, db: DbSession = Depends(get_session)):
+    return await run_db(db, create_group, data, schema=GroupRecord)
 
 
-@groups_router.get("/groups", response_model=List[GroupOutput])
-def read_groups(db: Session = Depends(get_db)):
-    return get_groups(db)
+@groups_router.post("/groups/batch", response_model=BatchResult)
+async def add_groups_batch(groups: List[GroupCreate], mode: BatchModeEnum = BatchModeEnum.atomic,
+                           db: DbSession = Depends(get_session)):
+    return await run_db(db, create_batch, GROUP_BATCH, groups, mode)
+
+
+@groups_router.put("/groups/batch", response_model=BatchResult)
+async def modify_groups_batch(groups: List[GroupBatchUpdate], mode: BatchModeEnum = BatchModeEnum.atomic,
+                              db: DbSession = Depends(get_session)):
+    return await run_db(db, update_batch, GROUP_BATCH, groups, mode)
+
+
+@groups_router.get("/groups", response_model=Page[GroupOutput])
+async def read_groups(request: Request, response: Response,
+                      limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                      after: Optional[int] = None,
+                      db: DbSession = Depends(get_session)):
+    return await cached_conditional(
+        request, response, db, f"groups:list:{limit}:{after}",
+        lambda session: get_list_version(session, Groups, limit, after),
+        lambda session: get_groups(session, limit, after, GroupOutput)
+    )
 
 
 @groups_router.get("/groups/{group_id}", response_model=GroupDetail)
-def read_group(group_id: int, db: Session = Depends(get_db)):
-    return get_group(db, group_id)
+async def read_group(group_id: int, request: Request, response: Response,
+                     db: DbSession = Depends(get_session)):
+    not_modified = conditional_response(request, response, await run_db(db, get_group_version, group_id))
+    if not_modified is not None:
+        return not_modified
+    return await run_db(db, get_group, group_id, schema=GroupDetail)
 
 
-@groups_router.put("/groups/{group_id}")
-def modify_group(data: GroupUpdate, group_id: int, db: Session = Depends(get_db)):
-    return update_group(db, group_id, data)
+@groups_router.put("/groups/{group_id}", response_model=GroupRecord)
+async def modify_group(data: GroupUpdate, group_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, update_group, group_id, data, schema=GroupRecord)
 
 
-@groups_router.delete("/groups/{group_id}")
-def remove_group(group_id: int, db: Session = Depends(get_db)):
-    return delete_group(db, group_id)
+@groups_router.delete("/groups/{group_id}", response_model=GroupRecord)
+async def remove_group(group_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, delete_group, group_id, schema=GroupRecord)
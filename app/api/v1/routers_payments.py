@@ -1,40 +1,108 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.session import get_db
+import io
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from typing import List, Optional
+from datetime import date
+from app.core.conditional import conditional_response
+from app.core.config import settings
+from app.db.imports import import_payments
+from app.db.models import Payments, Students
+from app.db.session import DbSession, get_session, run_db
 from app.db.schemas import (
     PaymentBase,
+    PaymentRecord,
     PaymentUpdate,
     PaymentCreate,
-    PaymentDetail, PaymentsOutput)
+    PaymentDetail, PaymentsOutput, PaymentFilter, Page,
+    PaymentImportResult,
+    PaymentReviewItem,
+    PaymentReviewResolve,
+    RevenueMonth,
+    StudentPaidTotal)
+from app.enums import SortOrderEnum
 from app.db.crud import (
     create_payment,
     get_payments,
     get_payment,
     update_payment,
-    delete_payment)
+    delete_payment,
+    get_list_version,
+    get_payment_version,
+    payment_filters,
+    get_revenue_by_month,
+    get_student_paid_totals,
+    get_payment_reviews,
+    resolve_payment_review,
+    delete_payment_review)
 
 payment_router = APIRouter()
 
-@payment_router.post("/payments")
-def add_payment(data: PaymentCreate, db: Session = Depends(get_db)):
-    return create_payment(db, data)
+@payment_router.post("/payments", response_model=PaymentRecord)
+async def add_payment(data: PaymentCreate, db: DbSession = Depends(get_session)):
+    return await run_db(db, create_payment, data, schema=PaymentRecord)
+
+@payment_router.get("/payments", response_model=Page[PaymentsOutput])
+async def read_payments(request: Request, response: Response,
+                        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                        after: Optional[int] = None,
+                        sort: SortOrderEnum = SortOrderEnum.asc,
+                        filters: PaymentFilter = Depends(),
+                        db: DbSession = Depends(get_session)):
+    not_modified = conditional_response(request, response, await run_db(
+        db, get_list_version, Payments, limit, after, sort == SortOrderEnum.desc, payment_filters(filters),
+        [(Students, Payments.student_id)]))
+    if not_modified is not None:
+        return not_modified
+    return await run_db(db, get_payments, limit, after, filters, sort == SortOrderEnum.desc, PaymentsOutput,
+                        schema=Page[PaymentsOutput])
+
+@payment_router.get("/payments/summary/monthly", response_model=List[RevenueMonth])
+async def read_monthly_revenue(date_from: Optional[date] = None, date_to: Optional[date] = None,
+                               db: DbSession = Depends(get_session)):
+    return await run_db(db, get_revenue_by_month, date_from, date_to, schema=List[RevenueMonth])
+
+@payment_router.get("/payments/summary/students", response_model=Page[StudentPaidTotal])
+async def read_student_paid_totals(limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                                   after: Optional[int] = None,
+                                   student_id: Optional[int] = None,
+                                   db: DbSession = Depends(get_session)):
+    return await run_db(db, get_student_paid_totals, limit, after, student_id, schema=Page[StudentPaidTotal])
+
+@payment_router.post("/payments/import", response_model=PaymentImportResult)
+async def import_bank_statement(file: UploadFile = File(...), db: DbSession = Depends(get_session)):
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    return await run_db(db, import_payments, lines)
+
+@payment_router.get("/payments/review", response_model=Page[PaymentReviewItem])
+async def read_payment_reviews(limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                               after: Optional[int] = None,
+                               db: DbSession = Depends(get_session)):
+    return await run_db(db, get_payment_reviews, limit, after, schema=Page[PaymentReviewItem])
+
+@payment_router.post("/payments/review/{review_id}/resolve", response_model=PaymentBase)
+async def resolve_review(review_id: int, data: PaymentReviewResolve, db: DbSession = Depends(get_session)):
+    return await run_db(db, resolve_payment_review, review_id, data, schema=PaymentBase)
 
-@payment_router.get("/payments", response_model=List[PaymentsOutput])
-def read_payments(db: Session = Depends(get_db)):
-    return get_payments(db)
+@payment_router.delete("/payments/review/{review_id}")
+async def dismiss_review(review_id: int, db: DbSession = Depends(get_session)):
+    await run_db(db, delete_payment_review, review_id)
+    return {"detail": f"Review {review_id} navbatdan o'chirildi"}
 
 @payment_router.get("/payments/{payment_id}", response_model=PaymentDetail)
-def read_payment(payment_id: int, db: Session = Depends(get_db)):
-    payment = get_payment(db, payment_id)
+async def read_payment(payment_id: int, request: Request, response: Response,
+                       db: DbSession = Depends(get_session)):
+    not_modified = conditional_response(request, response, await run_db(db, get_payment_version, payment_id))
+    if not_modified is not None:
+        return not_modified
+    payment = await run_db(db, get_payment, payment_id, schema=PaymentDetail)
     if not payment:
         raise HTTPException(status_code=404, detail="To'lov topilmadi")
     return payment
 
-@payment_router.put("/payments/{payment_id}")
-def modify_payment(payment_id: int, data: PaymentUpdate, db: Session = Depends(get_db)):
-    return update_payment(db, payment_id, data)
+@payment_router.put("/payments/{payment_id}", response_model=PaymentRecord)
+async def modify_payment(payment_id: int, data: PaymentUpdate, db: DbSession = Depends(get_session)):
+    return await run_db(db, update_payment, payment_id, data, schema=PaymentRecord)
 
-@payment_router.delete("/payments/{payment_id}")
-def remove_payment(payment_id: int, db: Session = Depends(get_db)):
-    return delete_payment(db, payment_id)
\ No newline at end of file
+@payment_router.delete("/payments/{payment_id}", response_model=PaymentRecord)
+async def remove_payment(payment_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, delete_payment, payment_id, schema=PaymentRecord)
\ No newline at end of file
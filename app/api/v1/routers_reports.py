@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from datetime import date
+from app.core.config import settings
+from app.db.models import AttendanceGroupDaily, AttendanceStudentDaily
+from app.db.session import DbSession, get_session, run_db
+from app.db.schemas import AtRiskStudent, AttendanceReportFilter, AttendanceReportRow, Debtor, Page
+from app.db.crud import get_at_risk_students, get_attendance_report, get_debtors
+
+reports_router = APIRouter()
+
+
+@reports_router.get("/reports/attendance/groups", response_model=List[AttendanceReportRow])
+async def read_group_attendance_report(filters: AttendanceReportFilter = Depends(),
+                                       db: DbSession = Depends(get_session)):
+    return await run_db(db, get_attendance_report, AttendanceGroupDaily, "group_id", filters, schema=List[AttendanceReportRow])
+
+
+@reports_router.get("/reports/attendance/teachers", response_model=List[AttendanceReportRow])
+async def read_teacher_attendance_report(filters: AttendanceReportFilter = Depends(),
+                                         db: DbSession = Depends(get_session)):
+    return await run_db(db, get_attendance_report, AttendanceGroupDaily, "teacher_id", filters, schema=List[AttendanceReportRow])
+
+
+@reports_router.get("/reports/attendance/students", response_model=List[AttendanceReportRow])
+async def read_student_attendance_report(filters: AttendanceReportFilter = Depends(),
+                                         db: DbSession = Depends(get_session)):
+    return await run_db(db, get_attendance_report, AttendanceStudentDaily, "student_id", filters, schema=List[AttendanceReportRow])
+
+
+@reports_router.get("/reports/attendance/at-risk", response_model=List[AtRiskStudent])
+async def read_at_risk_students(min_absences: int = Query(settings.ABSENCE_STREAK_THRESHOLD, ge=1),
+                                group_id: Optional[int] = None,
+                                db: DbSession = Depends(get_session)):
+    return await run_db(db, get_at_risk_students, min_absences, group_id, schema=List[AtRiskStudent])
+
+
+@reports_router.get("/reports/debtors", response_model=Page[Debtor])
+async def read_debtors(period: Optional[date] = Query(None, description="Hisob oyi ichidagi istalgan sana (standart: joriy oy)"),
+                       group_id: Optional[int] = None,
+                       limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                       after: Optional[int] = None,
+                       db: DbSession = Depends(get_session)):
+    return await run_db(db, get_debtors, period or date.today(), limit, after, group_id, schema=Page[Debtor])
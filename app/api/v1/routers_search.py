@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from app.db.session import DbSession, get_session, run_db
+from app.db.schemas import SearchResult
+from app.db.crud import search_people
+
+search_router = APIRouter()
+
+
+@search_router.get("/search", response_model=List[SearchResult])
+async def search(q: str = Query(..., min_length=2, description="Ism, familiya yoki telefon raqami qismi"),
+                 limit: int = Query(20, ge=1, le=50),
+                 db: DbSession = Depends(get_session)):
+    return await run_db(db, search_people, q, limit, schema=List[SearchResult])
@@ -1,50 +1,127 @@
 from http.client import HTTPException
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
+import io
 
-from app.db.schemas import StudentCreate, StudentInfo, StudentDetail, StudentGroupInfo, StudentUpdate
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, File, Query, Request, Response, UploadFile
+from typing import List, Optional
+
+from app.db.schemas import (
+    StudentCreate,
+    StudentInfo,
+    StudentDetail,
+    StudentRecord,
+    StudentGroupInfo,
+    StudentUpdate,
+    StudentImportResult,
+    MembershipIds,
+    MembershipChange,
+    AttendanceBase,
+    AttendanceFilter,
+    PaymentBase,
+    PaymentFilter,
+    Page)
+from app.core.conditional import conditional_response
+from app.core.config import settings
+from app.db.associations import STUDENT_GROUPS, STUDENT_TEACHERS
+from app.db.imports import import_students
+from app.db.models import Students
+from app.db.session import DbSession, get_session, run_db
 from app.db.crud import (
     create_student,
     get_student,
     get_students,
     update_student,
-    delete_student, delete_teacher_from_student, delete_group_from_student
-)
+    delete_student, delete_teacher_from_student, delete_group_from_student,
+    assign_members,
+    unassign_members,
+    get_attendances,
+    get_payments,
+    get_list_version,
+    get_student_version)
 
 student_router = APIRouter()
 
 # from app.db.schemas import
 
-@student_router.post("/students")
-def add_student(student: StudentCreate, db: Session = Depends(get_db)):
-    return create_student(db, student)
+@student_router.post("/students", response_model=StudentRecord)
+async def add_student(student: StudentCreate, db: DbSession = Depends(get_session)):
+    return await run_db(db, create_student, student, schema=StudentRecord)
+
+
+@student_router.post("/students/import", response_model=StudentImportResult)
+async def import_students_csv(file: UploadFile = File(...), db: DbSession = Depends(get_session)):
+    # Fayl butunlay xotiraga o'qilmaydi: qatorlar chunk'lab o'qilib staging jadvalga COPY qilinadi
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    return await run_db(db, import_students, lines)
 
 
-@student_router.get("/students", response_model=List[StudentGroupInfo])
-def read_students(db: Session = Depends(get_db)):
-    return get_students(db)
+@student_router.get("/students", response_model=Page[StudentGroupInfo])
+async def read_students(request: Request, response: Response,
+                        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                        after: Optional[int] = None,
+                        db: DbSession = Depends(get_session)):
+    not_modified = conditional_response(request, response, await run_db(db, get_list_version, Students, limit, after))
+    if not_modified is not None:
+        return not_modified
+    return await run_db(db, get_students, limit, after, StudentGroupInfo, schema=Page[StudentGroupInfo])
 
 
 @student_router.get("/students/{student_id}", response_model=StudentDetail)
-def read_student(student_id: int, db: Session = Depends(get_db)):
-    return get_student(db, student_id)
+async def read_student(student_id: int, request: Request, response: Response,
+                       db: DbSession = Depends(get_session)):
+    not_modified = conditional_response(request, response, await run_db(db, get_student_version, student_id))
+    if not_modified is not None:
+        return not_modified
+    return await run_db(db, get_student, student_id, schema=StudentDetail)
+
+
+@student_router.get("/students/{student_id}/attendances", response_model=Page[AttendanceBase])
+async def read_student_attendances(student_id: int,
+                                   limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                                   after: Optional[int] = None,
+                                   db: DbSession = Depends(get_session)):
+    return await run_db(db, get_attendances, limit, after,
+                        AttendanceFilter(student_id=student_id), True, AttendanceBase, schema=Page[AttendanceBase])
 
+@student_router.get("/students/{student_id}/payments", response_model=Page[PaymentBase])
+async def read_student_payments(student_id: int,
+                                limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                                after: Optional[int] = None,
+                                db: DbSession = Depends(get_session)):
+    return await run_db(db, get_payments, limit, after,
+                        PaymentFilter(student_id=student_id), True, PaymentBase, schema=Page[PaymentBase])
 
-@student_router.put("/students/{student_id}")
-def modify_student(student_id: int, data_update: StudentUpdate, db: Session = Depends(get_db)):
-    return update_student(db, student_id, data_update)
 
+@student_router.put("/students/{student_id}", response_model=StudentRecord)
+async def modify_student(student_id: int, data_update: StudentUpdate, db: DbSession = Depends(get_session)):
+    return await run_db(db, update_student, student_id, data_update, schema=StudentRecord)
 
-@student_router.delete("/students/{student_id}")
-def remove_student(student_id: int, db: Session = Depends(get_db)):
-    return delete_student(db, student_id)
 
-@student_router.delete("students/{student_id/teachers/{teacher_id}")
-def remove_teacher_from_student(student_id: int, teacher_id: int, db: Session = Depends(get_db)):
-    return delete_teacher_from_student(student_id, teacher_id, db)
+@student_router.delete("/students/{student_id}", response_model=StudentRecord)
+async def remove_student(student_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, delete_student, student_id, schema=StudentRecord)
+
+@student_router.delete("/students/{student_id}/teachers/{teacher_id}")
+async def remove_teacher_from_student(student_id: int, teacher_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, lambda session: delete_teacher_from_student(student_id, teacher_id, session))
 
 @student_router.delete("/students/{student_id}/groups/{group_id}")
-def remove_group_from_student(student_id: int, group_id: int, db: Session = Depends(get_db)):
-    return delete_group_from_student(student_id, group_id, db)
\ No newline at end of file
+async def remove_group_from_student(student_id: int, group_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, lambda session: delete_group_from_student(student_id, group_id, session))
+
+@student_router.post("/students/{student_id}/teachers", response_model=MembershipChange)
+async def assign_teachers_to_student(student_id: int, data: MembershipIds, db: DbSession = Depends(get_session)):
+    return await run_db(db, assign_members, STUDENT_TEACHERS, student_id, data.ids)
+
+@student_router.delete("/students/{student_id}/teachers", response_model=MembershipChange)
+async def unassign_teachers_from_student(student_id: int, ids: List[int] = Query(..., min_length=1),
+                                         db: DbSession = Depends(get_session)):
+    return await run_db(db, unassign_members, STUDENT_TEACHERS, student_id, ids)
+
+@student_router.post("/students/{student_id}/groups", response_model=MembershipChange)
+async def assign_groups_to_student(student_id: int, data: MembershipIds, db: DbSession = Depends(get_session)):
+    return await run_db(db, assign_members, STUDENT_GROUPS, student_id, data.ids)
+
+@student_router.delete("/students/{student_id}/groups", response_model=MembershipChange)
+async def unassign_groups_from_student(student_id: int, ids: List[int] = Query(..., min_length=1),
+                                       db: DbSession = Depends(get_session)):
+    return await run_db(db, unassign_members, STUDENT_GROUPS, student_id, ids)
\ No newline at end of file
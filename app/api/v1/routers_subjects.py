@@ -1,33 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.session import get_db
-from app.db.schemas import SubjectCreate, SubjectDetail, SubjectBase, SubjectResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
+from app.core.conditional import cached_conditional
+from app.core.config import settings
+from app.db.batch import SUBJECT_BATCH, create_batch, update_batch
+from app.db.models import Subjects
+from app.db.session import DbSession, get_session, run_db
+from app.db.schemas import SubjectCreate, SubjectDetail, SubjectBase, SubjectRecord, SubjectResponse, SubjectBatchUpdate, AttendanceBase, AttendanceFilter, BatchResult, Page
+from app.enums import BatchModeEnum
 from app.db.crud import (
     create_subject,
     get_subjects,
     get_subject_by_id,
     update_subject,
-    delete_subject)
+    delete_subject,
+    get_attendances,
+    get_list_version,
+    get_subject_version)
 
 subject_router = APIRouter()
 
-@subject_router.post("/subjects")
-def add_subject(data: SubjectCreate, db: Session = Depends(get_db)):
-    return create_subject(db, data)
+@subject_router.post("/subjects", response_model=SubjectRecord)
+async def add_subject(data: SubjectCreate, db: DbSession = Depends(get_session)):
+    return await run_db(db, create_subject, data, schema=SubjectRecord)
 
-@subject_router.get("/subjects")
-def read_subjects(db: Session = Depends(get_db)):
-    return get_subjects(db)
+@subject_router.post("/subjects/batch", response_model=BatchResult)
+async def add_subjects_batch(subjects: List[SubjectCreate], mode: BatchModeEnum = BatchModeEnum.atomic,
+                             db: DbSession = Depends(get_session)):
+    return await run_db(db, create_batch, SUBJECT_BATCH, subjects, mode)
+
+@subject_router.put("/subjects/batch", response_model=BatchResult)
+async def modify_subjects_batch(subjects: List[SubjectBatchUpdate], mode: BatchModeEnum = BatchModeEnum.atomic,
+                                db: DbSession = Depends(get_session)):
+    return await run_db(db, update_batch, SUBJECT_BATCH, subjects, mode)
+
+@subject_router.get("/subjects", response_model=Page[SubjectBase])
+async def read_subjects(request: Request, response: Response,
+                        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                        after: Optional[int] = None,
+                        db: DbSession = Depends(get_session)):
+    return await cached_conditional(
+        request, response, db, f"subjects:list:{limit}:{after}",
+        lambda session: get_list_version(session, Subjects, limit, after),
+        lambda session: get_subjects(session, limit, after, SubjectBase)
+    )
 
 @subject_router.get("/subjects/{subject_id}", response_model=SubjectResponse)
-def read_subject(subject_id: int, db: Session = Depends(get_db)):
-    return get_subject_by_id(db, subject_id)
+async def read_subject(subject_id: int, request: Request, response: Response,
+                       db: DbSession = Depends(get_session)):
+    return await cached_conditional(
+        request, response, db, f"subjects:detail:{subject_id}",
+        lambda session: get_subject_version(session, subject_id),
+        lambda session: get_subject_by_id(session, subject_id)
+    )
+
+@subject_router.get("/subjects/{subject_id}/attendances", response_model=Page[AttendanceBase])
+async def read_subject_attendances(subject_id: int,
+                                   limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                                   after: Optional[int] = None,
+                                   db: DbSession = Depends(get_session)):
+    return await run_db(db, get_attendances, limit, after,
+                        AttendanceFilter(subject_id=subject_id), True, AttendanceBase, schema=Page[AttendanceBase])
 
-@subject_router.put("/subjects/{subject_id}")
-def modify_subject(subject_id: int, data: SubjectCreate, db: Session = Depends(get_db)):
-    return update_subject(db, subject_id, data)
+@subject_router.put("/subjects/{subject_id}", response_model=SubjectRecord)
+async def modify_subject(subject_id: int, data: SubjectCreate, db: DbSession = Depends(get_session)):
+    return await run_db(db, update_subject, subject_id, data, schema=SubjectRecord)
 
-@subject_router.delete("/subjects/{subject_id}")
-def remove_subject(subject_id: int, db: Session = Depends(get_db)):
-    return delete_subject(db, subject_id)
\ No newline at end of file
+@subject_router.delete("/subjects/{subject_id}", response_model=SubjectRecord)
+async def remove_subject(subject_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, delete_subject, subject_id, schema=SubjectRecord)
\ No newline at end of file
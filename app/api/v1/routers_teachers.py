@@ -1,52 +1,127 @@
 from http.client import HTTPException
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, Query, Request, Response
+from typing import List, Optional
+from app.core.conditional import conditional_response
+from app.core.config import settings
+from app.db.associations import TEACHER_GROUPS, TEACHER_STUDENTS
+from app.db.batch import TEACHER_BATCH, create_batch, update_batch
+from app.db.models import Teachers
+from app.db.session import DbSession, get_session, run_db
 from app.db.crud import (
     create_teachers,
     get_teachers,
     get_teacher,
     update_teacher,
-    delete_teacher, delete_group_from_teacher, delete_student_from_teacher
-)
-from app.db.schemas import TeacherBase, TeacherDetail, TeacherCreate, TeacherUpdate, TeacherOutput
+    delete_teacher, delete_group_from_teacher, delete_student_from_teacher,
+    assign_members,
+    unassign_members,
+    get_attendances,
+    get_list_version,
+    get_teacher_version)
+from app.db.schemas import (
+    TeacherBase,
+    TeacherDetail,
+    TeacherRecord,
+    TeacherCreate,
+    TeacherUpdate,
+    TeacherBatchUpdate,
+    TeacherOutput,
+    BatchResult,
+    MembershipIds,
+    MembershipChange,
+    AttendanceBase,
+    AttendanceFilter,
+    Page)
+from app.enums import BatchModeEnum
 
 teacher_router = APIRouter()
 
 
 # Teacher modeli uchun router
 
-@teacher_router.post("/teachers")
-def add_teacher(teacher: TeacherCreate, db: Session = Depends(get_db)):
-    return create_teachers(db, teacher)
+@teacher_router.post("/teachers", response_model=TeacherRecord)
+async def add_teacher(teacher: TeacherCreate, db: DbSession = Depends(get_session)):
+    return await run_db(db, create_teachers, teacher, schema=TeacherRecord)
 
 
-@teacher_router.get("/teachers", response_model=List[TeacherOutput])
-def read_teachers(db: Session = Depends(get_db)):
-    return get_teachers(db)
+@teacher_router.post("/teachers/batch", response_model=BatchResult)
+async def add_teachers_batch(teachers: List[TeacherCreate], mode: BatchModeEnum = BatchModeEnum.atomic,
+                             db: DbSession = Depends(get_session)):
+    return await run_db(db, create_batch, TEACHER_BATCH, teachers, mode)
+
+
+@teacher_router.put("/teachers/batch", response_model=BatchResult)
+async def modify_teachers_batch(teachers: List[TeacherBatchUpdate], mode: BatchModeEnum = BatchModeEnum.atomic,
+                                db: DbSession = Depends(get_session)):
+    return await run_db(db, update_batch, TEACHER_BATCH, teachers, mode)
+
+
+@teacher_router.get("/teachers", response_model=Page[TeacherOutput])
+async def read_teachers(request: Request, response: Response,
+                        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                        after: Optional[int] = None,
+                        db: DbSession = Depends(get_session)):
+    not_modified = conditional_response(request, response, await run_db(db, get_list_version, Teachers, limit, after))
+    if not_modified is not None:
+        return not_modified
+    return await run_db(db, get_teachers, limit, after, TeacherOutput, schema=Page[TeacherOutput])
 
 
 @teacher_router.get("/teachers/{teacher_id}", response_model=TeacherDetail)
-def read_teacher(teacher_id: int, db: Session = Depends(get_db)):
-    return get_teacher(db, teacher_id)
+async def read_teacher(teacher_id: int, request: Request, response: Response,
+                       db: DbSession = Depends(get_session)):
+    not_modified = conditional_response(request, response, await run_db(db, get_teacher_version, teacher_id))
+    if not_modified is not None:
+        return not_modified
+    return await run_db(db, get_teacher, teacher_id, schema=TeacherDetail)
 
 
-@teacher_router.put("/teachers/{teacher_id}")
-def modify_teacher(teacher_id: int, data_update: TeacherUpdate, db: Session = Depends(get_db)):
-    return update_teacher(db, teacher_id, data_update)
+@teacher_router.get("/teachers/{teacher_id}/attendances", response_model=Page[AttendanceBase])
+async def read_teacher_attendances(teacher_id: int,
+                                   limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+                                   after: Optional[int] = None,
+                                   db: DbSession = Depends(get_session)):
+    return await run_db(db, get_attendances, limit, after,
+                        AttendanceFilter(teacher_id=teacher_id), True, AttendanceBase, schema=Page[AttendanceBase])
 
 
-@teacher_router.delete("/teachers/{teacher_id}")
-def remove_teacher(teacher_id: int, db: Session = Depends(get_db)):
-    return delete_teacher(db, teacher_id)
+@teacher_router.put("/teachers/{teacher_id}", response_model=TeacherRecord)
+async def modify_teacher(teacher_id: int, data_update: TeacherUpdate, db: DbSession = Depends(get_session)):
+    return await run_db(db, update_teacher, teacher_id, data_update, schema=TeacherRecord)
+
+
+@teacher_router.delete("/teachers/{teacher_id}", response_model=TeacherRecord)
+async def remove_teacher(teacher_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, delete_teacher, teacher_id, schema=TeacherRecord)
 
 
 @teacher_router.delete("/teachers/{teacher_id}/groups/{group_id}")
-def remove_group_from_teacher(teacher_id: int, group_id: int, db: Session = Depends(get_db)):
-    return delete_group_from_teacher(teacher_id, group_id, db)
+async def remove_group_from_teacher(teacher_id: int, group_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, lambda session: delete_group_from_teacher(teacher_id, group_id, session))
 
 
 @teacher_router.delete("/teachers/{teacher_id}/students/{student_id}")
-def remove_student_from_teacher(teacher_id: int, student_id: int, db: Session = Depends(get_db)):
-    return delete_student_from_teacher(teacher_id, student_id, db)
+async def remove_student_from_teacher(teacher_id: int, student_id: int, db: DbSession = Depends(get_session)):
+    return await run_db(db, lambda session: delete_student_from_teacher(teacher_id, student_id, session))
+
+
+@teacher_router.post("/teachers/{teacher_id}/groups", response_model=MembershipChange)
+async def assign_groups_to_teacher(teacher_id: int, data: MembershipIds, db: DbSession = Depends(get_session)):
+    return await run_db(db, assign_members, TEACHER_GROUPS, teacher_id, data.ids)
+
+
+@teacher_router.delete("/teachers/{teacher_id}/groups", response_model=MembershipChange)
+async def unassign_groups_from_teacher(teacher_id: int, ids: List[int] = Query(..., min_length=1),
+                                       db: DbSession = Depends(get_session)):
+    return await run_db(db, unassign_members, TEACHER_GROUPS, teacher_id, ids)
+
+
+@teacher_router.post("/teachers/{teacher_id}/students", response_model=MembershipChange)
+async def assign_students_to_teacher(teacher_id: int, data: MembershipIds, db: DbSession = Depends(get_session)):
+    return await run_db(db, assign_members, TEACHER_STUDENTS, teacher_id, data.ids)
+
+
+@teacher_router.delete("/teachers/{teacher_id}/students", response_model=MembershipChange)
+async def unassign_students_from_teacher(teacher_id: int, ids: List[int] = Query(..., min_length=1),
+                                         db: DbSession = Depends(get_session)):
+    return await run_db(db, unassign_members, TEACHER_STUDENTS, teacher_id, ids)
@@ -0,0 +1,118 @@
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Optional
+
+from app.core.config import settings
+
+MISSING = object()
+
+
+class CacheBackend:
+    """
+    Kesh saqlovchisi uchun interfeys. In-memory saqlovchini keyinchalik umumiy (masalan Redis)
+    saqlovchiga almashtirish uchun shu metodlarni amalga oshirgan klass CACHE_BACKEND orqali beriladi.
+    """
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Bitta jarayon uchun TTL va LRU (eng uzoq ishlatilmagan yozuv chiqariladi) asosidagi kesh."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+
+def build_cache(max_entries: int = settings.CACHE_MAX_ENTRIES, ttl: float = settings.CACHE_TTL_SECONDS):
+    # CACHE_BACKEND: "memory" yoki "package.module:ClassName" ko'rinishidagi CacheBackend klassi
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCache(max_entries, ttl)
+
+    module_name, class_name = settings.CACHE_BACKEND.split(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(max_entries=max_entries, ttl=ttl)
+
+
+cache = build_cache()  # Kam o'zgaradigan ma'lumotlar (fanlar, guruhlar, adminlar) uchun
+user_cache = build_cache(settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL_SECONDS)  # user_id -> AuthenticatedUser
+
+
+def cached(namespace: str):
+    """
+    crud.py dagi o'qish funksiyasi natijasini keshlaydi. Funksiya birinchi argument sifatida
+    sessiyani oladi, kalit qolgan argumentlardan tuziladi. None natijalar keshlanmaydi.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(db, *args, **kwargs):
+            key = f"{namespace}:{fn.__name__}:{args!r}:{sorted(kwargs.items())!r}"
+            value = cache.get(key)
+            if value is not MISSING:
+                return value
+
+            value = fn(db, *args, **kwargs)
+            if value is not None:
+                cache.set(key, value)
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidate(*namespaces: str):
+    for namespace in namespaces:
+        cache.delete_prefix(f"{namespace}:")
+
+
+def user_cache_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def invalidate_user(user_id: int):
+    user_cache.delete(user_cache_key(user_id))
@@ -0,0 +1,87 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple, Optional
+
+from fastapi import Request, Response
+
+from app.core.cache import MISSING, cache
+from app.db.session import DbSession, run_db
+
+
+"""
+ETag / Last-Modified asosidagi shartli GET so'rovlar.
+Versiya crud.py dagi get_*_version funksiyalari qaytaradigan agregat qator (max(updated_at), count, sum(id))
+bo'lib, u obyektlar yuklanishidan oldin hisoblanadi (ro'yxatlarda faqat so'ralgan keyset oynasi bo'yicha).
+Mijozdagi nusxa eskirmagan bo'lsa 304 qaytariladi.
+Last-Modified faqat o'chirish ham siljita oladigan vaqtdan olinadi: detail versiyalarida bog'lanish yoki
+ichki yozuv o'chirilganda ota yozuvning updated_at i yangilanadi (app/db/touch.py). Ro'yxat oynasidan qator
+o'chirilishi hech bir updated_at ni siljitmaydi, shuning uchun ro'yxatlar faqat ETag qaytaradi.
+Keshlanadigan endpointlarda (subjects, groups) versiya javob bilan bitta kesh yozuvida saqlanadi (cached_conditional).
+"""
+
+
+class Version(NamedTuple):
+    tag: tuple  # ETag shu qiymatlardan hisoblanadi
+    last_modified: Optional[datetime] = None
+
+
+def _last_modified(version: Version) -> Optional[datetime]:
+    last_modified = version.last_modified
+    if last_modified is None:
+        return None
+
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def conditional_response(request: Request, response: Response, version: Version) -> Optional[Response]:
+    fingerprint = f"{request.url.path}?{request.url.query}|{tuple(version.tag)!r}"
+    etag = f'W/"{hashlib.md5(fingerprint.encode()).hexdigest()}"'
+    headers = {"ETag": etag}
+
+    last_modified = _last_modified(version)
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    response.headers.update(headers)
+
+    # If-None-Match berilgan bo'lsa If-Modified-Since hisobga olinmaydi (RFC 9110)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if since.tzinfo is not None and last_modified <= since:
+            return Response(status_code=304, headers=headers)
+
+    return None
+
+
+async def cached_conditional(request: Request, response: Response, db: DbSession, key: str, version_fn, payload_fn):
+    """
+    Versiya va javob bitta kesh yozuvida (key, invalidate qiladigan namespace bilan boshlanadi) saqlanadi.
+    Kesh amal qilayotganda 304 qarori bazaga murojaat qilmasdan qabul qilinadi. Kesh bo'sh bo'lsa avval faqat
+    agregat versiya so'raladi, javob 304 bo'lmagandagina yuklanadi va versiya bilan birga keshlanadi.
+    Versiya javobdan oldin olinadi, shuning uchun keshdagi versiya hech qachon javobdan yangi bo'lmaydi.
+    """
+    entry = cache.get(key)
+    version = entry[0] if entry is not MISSING else await run_db(db, version_fn)
+    not_modified = conditional_response(request, response, version)
+    if not_modified is not None:
+        return not_modified
+    if entry is not MISSING:
+        return entry[1]
+
+    payload = await run_db(db, payload_fn)
+    if payload is not None:
+        cache.set(key, (version, payload))
+    return payload
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 """
@@ -8,6 +9,19 @@ Agar mavjud bo'lsa, bazaga ulanish ishlaydi, aks xolda, xatolik chiqaradi.
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # True bo'lsa routerlar AsyncSession (asyncpg) bilan ishlaydi
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Connection pool sozlamalari
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WAIT_WARN_MS: float = 100  # Shundan uzoq kutilgan checkout logga yoziladi
+    # Sync handlerlar uchun anyio threadpool hajmi (berilmasa DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    THREADPOOL_SIZE: Optional[int] = None
     # DB_NAME: str = "product_inventory"
     # DB_USER: str = "postgres"
     # DB_PASSWORD: str = "your_password"
@@ -17,9 +31,45 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Boshqa worker'larda qilingan logout'lar revoked_tokens jadvalidan shuncha soniyada bir marta olinadi
+    REVOKED_TOKENS_SYNC_SECONDS: float = 5
+
+    # Ro'yxat endpointlari uchun sahifalash (keyset pagination) chegaralari
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 500
+    # Detail endpointlarida qaytariladigan oxirgi davomat/to'lov yozuvlari soni
+    DETAIL_HISTORY_LIMIT: int = 20
+    BATCH_MAX_ITEMS: int = 500  # /batch endpointlarida bitta so'rovdagi elementlar chegarasi
+    ABSENCE_STREAK_THRESHOLD: int = 3  # Shuncha ketma-ket dars qoldirgan student xavf ro'yxatiga tushadi
+
+    # Kam o'zgaradigan ma'lumotlar keshi: "memory" yoki "package.module:ClassName" (CacheBackend)
+    CACHE_BACKEND: str = "memory"
+    CACHE_TTL_SECONDS: float = 300
+    CACHE_MAX_ENTRIES: int = 1024
+    USER_CACHE_TTL_SECONDS: float = 60  # verify_token uchun foydalanuvchi keshi
+    # Keshlangan TeacherScope shundan eski bo'lsa, ruxsat berishdan oldin bazadan qayta yuklanadi
+    SCOPE_MAX_AGE_SECONDS: float = 5
+    USER_CACHE_MAX_ENTRIES: int = 4096
+    # bcrypt cost; calibrate_password_hash.py server uchun hisoblab .env ga yozadi.
+    # Boshqa cost bilan saqlangan parollar login paytida qayta hash qilinadi
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # bcrypt uchun alohida threadlar soni
+    PASSWORD_HASH_QUEUE_MAX: int = 64  # Navbat shundan oshsa login/register 503 qaytaradi
 
     class Config:
         env_file = ".env"
         extra = "ignore"
 
+    @property
+    def async_database_url(self) -> str:
+        if self.ASYNC_DATABASE_URL:
+            return self.ASYNC_DATABASE_URL
+        return self.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    @property
+    def threadpool_size(self) -> int:
+        # Threadlar pool sig'imidan ko'p bo'lsa, ortiqchalari checkout navbatida turib qoladi
+        return self.THREADPOOL_SIZE or self.DB_POOL_SIZE + self.DB_MAX_OVERFLOW
+
 settings = Settings()
\ No newline at end of file
@@ -1,14 +1,31 @@
-from app.core.security import create_access_token, verify_password, create_refresh_token
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_access_token,
+    decode_refresh_token,
+    hash_password_async,
+    password_needs_rehash,
+    verify_password_async
+)
 from app.db.schemas import UserCreate, UserLogin, AdminDetail, TeacherDetail, TeacherGroupInfo
-from app.db.models import User, Admins, Teachers, Groups
-from app.db.crud import create_user, save_refresh_token
+from app.core.scope import get_teacher_scope
+from app.db.models import User, Admins
+from app.db.crud import (
+    create_user,
+    save_refresh_token,
+    rotate_refresh_token,
+    revoke_access_token,
+    revoke_refresh_token
+)
 from app.core.utils import get_user_by_username
-from sqlalchemy.orm import Session, joinedload
-from fastapi import HTTPException, Request
+from sqlalchemy.orm import Session
+from fastapi import BackgroundTasks, HTTPException, Request
 from app.core.config import settings
 from fastapi.params import Depends
-from app.db.session import get_db
-from datetime import timedelta
+from app.db.session import DbSession, SessionLocal, get_db, run_db
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from jose import JWTError
 import logging
 import jwt
@@ -17,23 +34,45 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def register(user: UserCreate, db: Session):
-    db_user_username = get_user_by_username(user.username, db)
+# bcrypt password_hasher executor'ida, baza bilan ishlash esa run_db orqali bajariladi
+
+async def register(user: UserCreate, db: DbSession):
+    db_user_username = await run_db(db, lambda session: get_user_by_username(user.username, session))
     if db_user_username:
         raise HTTPException(status_code=409, detail="Bunday username bilan avval ro'yxatdan o'tilgan !")
 
-    return create_user(db, user)
+    hashed_password = await hash_password_async(user.password)
+    return await run_db(db, create_user, user, hashed_password)
 
 
-def login(data: UserLogin, db: Session):
-    user = db.query(User).filter(User.username == data.username).first()
-    if not user or not verify_password(data.password, user.password):
+async def login(data: UserLogin, db: DbSession, background_tasks: BackgroundTasks):
+    user = await run_db(db, lambda session: get_user_by_username(data.username, session))
+    if not user or not await verify_password_async(data.password, user.password):
         raise HTTPException(status_code=401, detail="Noto'g'ri username yoki password kiritildi !")
 
     logger.info(f"User username: {data.username}")
-    logger.info(f"User password: {data.password}")
-    logger.info(f"Verify result: {data.password, user.password}")
+    if password_needs_rehash(user.password):
+        background_tasks.add_task(rehash_password, user.id, user.password, data.password)
+    return await run_db(db, lambda session: issue_tokens(user, session))
+
+
+async def rehash_password(user_id: int, old_hash: str, password: str):
+    # Javob qaytgandan keyin ishlaydi; parol shu orada o'zgargan bo'lsa yangilanmaydi
+    new_hash = await hash_password_async(password)
+
+    def save(db: Session):
+        updated = db.query(User).filter(User.id == user_id, User.password == old_hash).update(
+            {User.password: new_hash}, synchronize_session=False
+        )
+        db.commit()
+        return updated
 
+    with SessionLocal() as db:
+        if await run_in_threadpool(save, db):
+            logger.info("User id = %s paroli yangi cost bilan qayta hash qilindi", user_id)
+
+
+def issue_tokens(user: User, db: Session):
     if user.role.value == "admin":
         admin = db.query(Admins).filter(Admins.id == user.admin_id).first()
         if not admin:
@@ -51,9 +90,10 @@ def login(data: UserLogin, db: Session):
         logger.info(f"Yaratilgan admin access token: {admin_access_token}")
 
         admin_refresh_token = create_refresh_token(
-            data={"sub": user.username},
-            expire_delta=timedelta(days=30)
+            data={"sub": user.username, "user_id": user.id},
+            expire_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
         )
+        save_refresh_token(db, user.id, admin_refresh_token)
 
         return {
             "access_token": admin_access_token,
@@ -65,13 +105,8 @@ def login(data: UserLogin, db: Session):
     elif user.role.value == "teacher":
         if not user.teacher_id:
             raise HTTPException(status_code=400, detail="Userga biriktirilgan teacher_id mavjud emas")
-        teacher = db.query(Teachers).options(
-            joinedload(Teachers.teacher_groups).joinedload(Groups.group_subject),
-            joinedload(Teachers.teacher_groups).joinedload(Groups.group_students)
-        ).filter(Teachers.id == user.teacher_id).first()
-
-        if not teacher:
-            raise HTTPException(status_code=404, detail="Teacher not found !")
+        # Ustoz mavjudligi tekshiriladi va davomat uchun ruxsat doirasi oldindan keshga olinadi
+        get_teacher_scope(db, user.teacher_id)
 
         teacher_access_token = create_access_token(
             data={
@@ -84,9 +119,10 @@ def login(data: UserLogin, db: Session):
         )
 
         teacher_refresh_token = create_refresh_token(
-            data={"sub": user.username},
-            expire_delta=timedelta(days=30)
+            data={"sub": user.username, "user_id": user.id},
+            expire_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
         )
+        save_refresh_token(db, user.id, teacher_refresh_token)
 
         return {
             "access_token": teacher_access_token,
@@ -95,8 +131,20 @@ def login(data: UserLogin, db: Session):
         }
 
 
-def logout():
-    return {"message": "Foydalanuvchi muvaffaqiyatli tizimdan chiqarildi. (Fronent tokenni o'chirib qo'yadi)"}
+def refresh(refresh_token: str, db: Session):
+    # Eski refresh token bekor qilinadi va yangi access/refresh juftligi qaytariladi (rotatsiya)
+    decode_refresh_token(refresh_token)
+    user = rotate_refresh_token(db, refresh_token)
+    return issue_tokens(user, db)
+
+
+def logout(token: str, refresh_token: Optional[str], db: Session):
+    payload = decode_access_token(token)
+    if payload.get("jti"):
+        revoke_access_token(db, payload["jti"], datetime.fromtimestamp(payload["exp"], timezone.utc))
+    if refresh_token:
+        revoke_refresh_token(db, refresh_token)
+    return {"message": "Foydalanuvchi muvaffaqiyatli tizimdan chiqarildi"}
 
     # access_token = create_access_token(
     #     data={"sub": user.username,
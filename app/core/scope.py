@@ -0,0 +1,102 @@
+import time
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.cache import MISSING, cache
+from app.core.config import settings
+from app.db.models import Groups, Teachers, student_group_association, teacher_group_association
+
+
+"""
+Ustozning ruxsat doirasi: unga biriktirilgan guruhlar, har bir guruhning fani va studentlari.
+Bir marta ikki so'rov bilan yig'iladi va keshda saqlanadi, shuning uchun davomat kiritishda
+"bu guruh/student shu ustozgami" tekshiruvi bazaga murojaat qilmasdan set orqali bajariladi.
+teacher_group_association yoki student_group_association o'zgarganda invalidate("scopes") chaqiriladi.
+invalidate faqat shu worker keshini tozalaydi, shuning uchun SCOPE_MAX_AGE_SECONDS dan eski scope
+ruxsat berish uchun ishlatilmaydi: u bazadan qayta yuklanadi.
+"""
+
+SCOPE_NAMESPACE = "scopes"
+
+
+class TeacherScope:
+    def __init__(self, teacher_id: int, subject_id: Optional[int], group_subjects: dict, group_students: dict):
+        self.teacher_id = teacher_id
+        self.subject_id = subject_id
+        self.group_subjects = group_subjects  # group_id -> group_subject_id
+        self.group_students = group_students  # group_id -> frozenset(student_id)
+        self.loaded_at = time.time()
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.loaded_at
+
+    @property
+    def group_ids(self) -> frozenset:
+        return frozenset(self.group_subjects)
+
+    @property
+    def student_ids(self) -> frozenset:
+        return frozenset().union(*self.group_students.values())
+
+    def has_group(self, group_id: int) -> bool:
+        return group_id in self.group_subjects
+
+    def group_subject_id(self, group_id: int) -> Optional[int]:
+        return self.group_subjects.get(group_id)
+
+    def teaches_group_subject(self, group_id: int) -> bool:
+        return self.subject_id is not None and self.group_subjects.get(group_id) == self.subject_id
+
+    def missing_students(self, group_id: int, student_ids: Iterable[int]) -> set:
+        # Guruhga biriktirilmagan (yoki umuman mavjud bo'lmagan) studentlar
+        return set(student_ids) - self.group_students.get(group_id, frozenset())
+
+
+def load_teacher_scope(db: Session, teacher_id: int) -> TeacherScope:
+    teacher = db.query(Teachers.id, Teachers.teacher_subject_id).filter(Teachers.id == teacher_id).first()
+    if not teacher:
+        raise HTTPException(status_code=404, detail="Teacher not found !")
+
+    rows = db.query(
+        teacher_group_association.c.groups_id,
+        Groups.group_subject_id,
+        student_group_association.c.students_id
+    ).join(
+        Groups, Groups.id == teacher_group_association.c.groups_id
+    ).outerjoin(
+        student_group_association, student_group_association.c.groups_id == teacher_group_association.c.groups_id
+    ).filter(teacher_group_association.c.teachers_id == teacher_id).all()
+
+    group_subjects = {}
+    group_students = {}
+    for group_id, subject_id, student_id in rows:
+        group_subjects[group_id] = subject_id
+        students = group_students.setdefault(group_id, set())
+        if student_id is not None:
+            students.add(student_id)
+
+    return TeacherScope(
+        teacher_id=teacher.id,
+        subject_id=teacher.teacher_subject_id,
+        group_subjects=group_subjects,
+        group_students={group_id: frozenset(students) for group_id, students in group_students.items()}
+    )
+
+
+def get_teacher_scope(db: Session, teacher_id: int, refresh: bool = False,
+                      max_age: Optional[float] = None) -> TeacherScope:
+    """
+    refresh=True yoki keshdagi scope max_age soniyadan eski bo'lsa bazadan qayta yuklanadi
+    (kesh boshqa worker'dagi o'zgarish tufayli eskirgan bo'lishi mumkin).
+    """
+    key = f"{SCOPE_NAMESPACE}:teacher:{teacher_id}"
+    scope = MISSING if refresh else cache.get(key)
+    if scope is not MISSING and max_age is not None and scope.age > max_age:
+        scope = MISSING
+    if scope is MISSING:
+        scope = load_teacher_scope(db, teacher_id)
+        cache.set(key, scope)
+    return scope
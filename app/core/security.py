@@ -1,14 +1,23 @@
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import HTTPException, Depends, Security
 from passlib.context import CryptContext
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from app.core.cache import MISSING, user_cache, user_cache_key
 from app.core.config import settings
-from app.db.models import User
+from app.db.models import RevokedToken, User
+from app.db.schemas import AuthenticatedUser
+from app.db.session import DbSession, get_session, run_db
 from jose import jwt, JWTError
 from dotenv import load_dotenv
+import asyncio
+import hashlib
 import logging
 import os
-from sqlalchemy.orm import Session
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session, load_only
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,7 +26,13 @@ load_dotenv()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 
 def hash_password(password: str) -> str:
@@ -28,6 +43,70 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    # Hash BCRYPT_ROUNDS dan boshqa cost bilan saqlangan bo'lsa True
+    return pwd_context.needs_update(hashed_password)
+
+
+class PasswordHasher:
+    """
+    bcrypt hisoblashlarini umumiy threadpool'dan ajratilgan, cheklangan executor'da bajaradi.
+    Login to'lqinida faqat shu navbat uzayadi, boshqa endpointlar threadlari band bo'lmaydi.
+    Navbat PASSWORD_HASH_QUEUE_MAX dan oshsa so'rov 503 bilan rad etiladi.
+    """
+
+    def __init__(self, workers: int, queue_max: int):
+        self.workers = workers
+        self.queue_max = queue_max
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.pending_max = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.queue_max:
+                self.rejected += 1
+                raise HTTPException(status_code=503, detail="Server band, birozdan so'ng qayta urinib ko'ring")
+            self.pending += 1
+            self.pending_max = max(self.pending_max, self.pending)
+
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.wait_total += time.perf_counter() - started
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_max": self.queue_max,
+                "pending": self.pending,
+                "pending_max": self.pending_max,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "latency_avg_ms": round(self.wait_total / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_MAX)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
 # def create_access_token(data: dict, expire_delta: timedelta):
 #     to_encode = data.copy()
 #     expire = datetime.now() + expire_delta
@@ -38,40 +117,153 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def create_access_token(data: dict, expire_delta: timedelta):
     to_encode = data.copy()
     expire = datetime.now() + expire_delta
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})  # jti - logout'da bekor qilish uchun
 
     to_encode.update({"user_id": data.get("user_id"), "is_registered": True})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str, db: Session):
-    print(f"Token turi: {type(token)}")  # Tokenning turini chiqaramiz
-    print(f"Token: {token}")
+
+class RevokedTokens:
+    """
+    Bekor qilingan access tokenlar jti -> expires_at, revoked_tokens jadvalining worker xotirasidagi nusxasi.
+    Token tekshiruvi shu nusxadan o'qiydi. Nusxa REVOKED_TOKENS_SYNC_SECONDS da bir marta jadvaldan
+    yangilanadi (sync_revoked_tokens), shuning uchun boshqa worker'da qilingan logout bu worker'da ham
+    ko'pi bilan shu vaqt ichida kuchga kiradi. O'z logout'lari add() bilan darhol qo'shiladi.
+    Muddati o'tgan yozuvlar load() da va add() ichida PRUNE_INTERVAL_SECONDS da bir marta tozalanadi.
+    """
+
+    PRUNE_INTERVAL_SECONDS = 60
+
+    def __init__(self, sync_interval: float):
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._synced_at = None
+        self._pruned_at = 0.0
+
+    def add(self, jti: str, expires_at: datetime):
+        with self._lock:
+            self._tokens[jti] = expires_at
+            if time.monotonic() - self._pruned_at >= self.PRUNE_INTERVAL_SECONDS:
+                self._prune()
+
+    def claim_sync(self) -> bool:
+        # Nusxa eskirgan bo'lsa, bir vaqtda kelgan so'rovlardan faqat bittasiga True qaytadi
+        with self._lock:
+            now = time.monotonic()
+            if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+                return False
+            self._synced_at = now
+            return True
+
+    def load(self, tokens):
+        # Bekor qilish qaytarilmaydi, shuning uchun jadvaldagi qatorlar mavjud nusxaga qo'shiladi:
+        # so'rov bajarilayotganda add() qilingan jti yo'qolib qolmaydi
+        with self._lock:
+            self._tokens.update(tokens)
+            self._prune()
+            self._synced_at = time.monotonic()
+
+    def _prune(self):
+        now = datetime.now(timezone.utc)
+        self._tokens = {jti: expires_at for jti, expires_at in self._tokens.items() if expires_at > now}
+        self._pruned_at = time.monotonic()
+
+    def __contains__(self, jti: str) -> bool:
+        expires_at = self._tokens.get(jti)
+        return expires_at is not None and expires_at > datetime.now(timezone.utc)
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+
+revoked_tokens = RevokedTokens(settings.REVOKED_TOKENS_SYNC_SECONDS)
+
+
+def sync_revoked_tokens(db: Session):
+    # Muddati o'tmagan barcha bekor qilingan jti lar; jadval ACCESS_TOKEN_EXPIRE_MINUTES ichidagi logout'lar bilan cheklangan
+    revoked_tokens.load(db.query(RevokedToken.jti, RevokedToken.expires_at).filter(
+        RevokedToken.expires_at > datetime.now(timezone.utc)
+    ).all())
+
+
+def hash_token(token: str) -> str:
+    # Refresh tokenlar bazada shu hash bo'yicha (unique index) qidiriladi
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def decode_access_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=settings.ALGORITHM)
-        user_id: int = payload.get("user_id")
-        is_registered: bool = payload.get("is_registered")
-        logging.info("User_id: %s", user_id)
-
-        if not user_id or not is_registered:
-            logging.info("User_id: %s", user_id)
-            raise HTTPException(status_code=403, detail="Foydalanuvchi ro'yxatdan o'tmagan yoki token no'to'gri ekan")
-
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            print("Foydalanuvchi topilmadi !")
-            raise HTTPException(status_code=404, detail="Bunday foydalanuvchi topilmadi !")
-        print(f"Topilgan foydalanuvchi !: {user}")
-        return user
-
     except JWTError as e:
-        print(f"Token verifikatsiyada xatolik: {e}")
+        logger.info("Token verifikatsiyada xatolik: %s", e)
         raise HTTPException(status_code=401, detail="Noto'g'ri token")
 
+    if payload.get("jti") in revoked_tokens:
+        raise HTTPException(status_code=401, detail="Token bekor qilingan")
+    return payload
+
+
+def decode_user_id(token: str) -> int:
+    payload = decode_access_token(token)
+    user_id: int = payload.get("user_id")
+    is_registered: bool = payload.get("is_registered")
+    if not user_id or not is_registered:
+        logger.info("User_id: %s", user_id)
+        raise HTTPException(status_code=403, detail="Foydalanuvchi ro'yxatdan o'tmagan yoki token no'to'gri ekan")
+    return user_id
+
+
+def get_authenticated_user(db: Session, user_id: int) -> AuthenticatedUser:
+    # Keshda bo'lsa bazaga murojaat qilinmaydi; update_user/delete_user/save_refresh_token keshni tozalaydi
+    user = user_cache.get(user_cache_key(user_id))
+    if user is not MISSING:
+        return user
+
+    user = db.query(User).options(load_only(
+        User.id, User.username, User.user_email, User.role, User.teacher_id, User.admin_id
+    )).filter(User.id == user_id).first()
+    if not user:
+        logger.info("Foydalanuvchi topilmadi: %s", user_id)
+        raise HTTPException(status_code=404, detail="Bunday foydalanuvchi topilmadi !")
+
+    user = AuthenticatedUser.model_validate(user, from_attributes=True)
+    user_cache.set(user_cache_key(user_id), user)
+    return user
+
+
+def verify_token(token: str, db: Session) -> AuthenticatedUser:
+    if revoked_tokens.claim_sync():
+        sync_revoked_tokens(db)
+    return get_authenticated_user(db, decode_user_id(token))
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: DbSession = Depends(get_session)):
+    if revoked_tokens.claim_sync():
+        await run_db(db, sync_revoked_tokens)
+    user_id = decode_user_id(token)
+    user = user_cache.get(user_cache_key(user_id))
+    if user is not MISSING:
+        return user  # Issiq token uchun sessiya ham, thread ham band qilinmaydi
+    return await run_db(db, get_authenticated_user, user_id)
+
 
 def create_refresh_token(data: dict, expire_delta: timedelta = timedelta(30)):
     to_encode = data.copy()
     expire = datetime.now() + expire_delta
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+
+def decode_refresh_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=settings.ALGORITHM)
+    except JWTError as e:
+        logger.info("Refresh token verifikatsiyada xatolik: %s", e)
+        raise HTTPException(status_code=401, detail="Noto'g'ri refresh token")
+
+    if payload.get("type") != "refresh":
+        raise HTTPException(status_code=401, detail="Noto'g'ri refresh token")
+    return payload
\ No newline at end of file
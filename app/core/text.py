@@ -0,0 +1,40 @@
+import re
+
+
+"""
+Qidiruv uchun matnni normallashtirish. fold_uz bazadagi IMMUTABLE uz_fold() SQL funksiyasi
+(alembic: 7c3e9a1f5b26) bilan aynan bir xil ishlaydi: kichik harfga o'tkazadi, o'zbek kirill
+harflarini lotinchaga o'giradi va tutuq belgilarini olib tashlaydi. Shunda "Шоҳруҳ", "Shohruh"
+va "Sho'hruh" bir xil ko'rinishga keladi va trigram indekslari ikkala yozuvda ham ishlaydi.
+Ikkala tomonni o'zgartirganda ikkinchisini ham yangilash kerak.
+"""
+
+# Bir harf -> bir necha harf (uz_fold dagi replace() chaqiruvlari bilan bir xil tartibda)
+UZ_MULTI = [
+    ("ё", "yo"),
+    ("ю", "yu"),
+    ("я", "ya"),
+    ("ц", "ts"),
+    ("ч", "ch"),
+    ("щ", "sh"),
+    ("ш", "sh"),
+    ("ж", "j"),
+]
+UZ_FROM = "абвгдезийклмнопрстуфхэўқғҳ"
+UZ_TO = "abvgdeziyklmnoprstufxeoqgh"
+UZ_DROP = "ъь'ʻʼ’‘`"
+
+_UZ_TABLE = str.maketrans(UZ_FROM, UZ_TO, UZ_DROP)
+_NON_DIGITS = re.compile(r"\D")
+
+
+def fold_uz(value: str) -> str:
+    value = value.lower()
+    for source, target in UZ_MULTI:
+        value = value.replace(source, target)
+    return value.translate(_UZ_TABLE)
+
+
+def normalize_phone(value: str) -> str:
+    # "+998 (90) 123-45-67" -> "998901234567"
+    return _NON_DIGITS.sub("", value)
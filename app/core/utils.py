@@ -1,4 +1,5 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, Query
+from typing import Optional
 
 from app.db.models import User
 import logging
@@ -10,3 +11,29 @@ def get_user_by_username(username: str, db: Session):
     user = db.query(User).filter(User.username == username).first()
     logging.info(f"Query-dan qaytgan user: {user}")
     return user
+
+
+def get_user_by_email(email: str, db: Session):
+    return db.query(User).filter(User.user_email == email).first()
+
+
+def paginate(query: Query, model, limit: int, after: Optional[int] = None, descending: bool = False):
+    """
+    Keyset (cursor) pagination: `id > after` (kamayish tartibida `id < after`) sharti bilan
+    primary key indeksi bo'yicha keyingi `limit` ta yozuvni oladi, shuning uchun sahifa narxi
+    jadval hajmiga bog'liq emas. Keyingi sahifa bormi yoki yo'qligini bilish uchun bitta
+    ortiqcha yozuv so'raladi.
+    """
+    if after is not None:
+        query = query.filter(model.id < after if descending else model.id > after)
+
+    order = model.id.desc() if descending else model.id
+    rows = query.order_by(order).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+
+    return {"items": rows[:limit], "next_cursor": next_cursor}
+
+
+def serialize_page(page: dict, schema) -> dict:
+    # Keshlanadigan sahifada sessiyaga bog'liq ORM obyektlar emas, tayyor pydantic obyektlar saqlanadi
+    return {**page, "items": [schema.model_validate(item, from_attributes=True) for item in page["items"]]}
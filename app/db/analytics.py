@@ -0,0 +1,121 @@
+import argparse
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models import Attendance, AttendanceStreak
+from app.enums import AttendanceEnum
+
+
+"""
+Ketma-ket dars qoldirish (absence streak) tahlili.
+attendance_streaks jadvali har bir (student, group) uchun oxirgi darslardan boshlab uzluksiz "absent"
+yozuvlar sonini saqlaydi, shuning uchun xavf ro'yxati tarixni ko'rib chiqmasdan shu jadvaldan o'qiladi.
+
+- Yangi kunlik davomat (create_attendance): record_submission bitta upsert bilan streak'ni +1 yoki 0 qiladi.
+- O'tgan kunlar tuzatilsa yoki o'chirilsa: rebuild_streaks faqat tegishli juftliklar uchun qayta hisoblaydi.
+- To'liq qayta hisoblash:  python -m app.db.analytics rebuild-streaks
+"""
+
+ABSENT = AttendanceEnum.absent.value
+Pair = Tuple[int, int]  # (student_id, group_id)
+
+
+def streak_select(*criteria):
+    """
+    Attendance ustidan bitta window-function o'tishi: har bir yozuv uchun o'zidan keyingi (yangiroq)
+    kelgan va absent bo'lmagan yozuvlar soni hisoblanadi. Bu son 0 bo'lgan yozuvlar joriy streak'ni tashkil qiladi.
+    """
+    partition = (Attendance.student_id, Attendance.group_id)
+    ordered = select(
+        Attendance.student_id,
+        Attendance.group_id,
+        Attendance.attendance_date,
+        func.sum(case((Attendance.status != ABSENT, 1), else_=0)).over(
+            partition_by=partition,
+            order_by=Attendance.attendance_date.desc(),
+            rows=(None, 0)
+        ).label("attended_after")
+    ).where(
+        Attendance.student_id.is_not(None),
+        Attendance.group_id.is_not(None),
+        Attendance.attendance_date.is_not(None),
+        *criteria
+    ).subquery()
+
+    return select(
+        ordered.c.student_id,
+        ordered.c.group_id,
+        func.count().filter(ordered.c.attended_after == 0).label("current_absences"),
+        func.max(ordered.c.attendance_date).label("last_attendance_date")
+    ).group_by(ordered.c.student_id, ordered.c.group_id)
+
+
+def rebuild_streaks(db: Session, pairs: Optional[Iterable[Pair]] = None):
+    # pairs berilmasa barcha streak'lar qayta hisoblanadi. Commit chaqiruvchi tomonidan qilinadi
+    criteria = []
+    delete_stmt = delete(AttendanceStreak)
+    if pairs is not None:
+        pairs = list(set(pairs))
+        if not pairs:
+            return
+        criteria.append(tuple_(Attendance.student_id, Attendance.group_id).in_(pairs))
+        delete_stmt = delete_stmt.where(tuple_(AttendanceStreak.student_id, AttendanceStreak.group_id).in_(pairs))
+
+    db.execute(delete_stmt)
+    db.execute(insert(AttendanceStreak).from_select(
+        ["student_id", "group_id", "current_absences", "last_attendance_date"],
+        streak_select(*criteria)
+    ))
+
+
+def record_submission(db: Session, group_id: int, attendance_date: date, statuses: Dict[int, str]):
+    """
+    Kunlik davomat yuborilganda streak'ni tarixni o'qimasdan yangilaydi: absent bo'lsa +1, aks holda 0.
+    Sana oxirgi saqlangan sanadan eski bo'lsa upsert hech narsa qilmaydi (bunday holatda rebuild_streaks ishlatiladi).
+    """
+    if not statuses:
+        return
+
+    stmt = pg_insert(AttendanceStreak).values([
+        {
+            "student_id": student_id,
+            "group_id": group_id,
+            "current_absences": 1 if status == ABSENT else 0,
+            "last_attendance_date": attendance_date
+        }
+        for student_id, status in statuses.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["student_id", "group_id"],
+        set_={
+            "current_absences": case(
+                (stmt.excluded.current_absences == 1, AttendanceStreak.current_absences + 1),
+                else_=0
+            ),
+            "last_attendance_date": stmt.excluded.last_attendance_date
+        },
+        where=AttendanceStreak.last_attendance_date < stmt.excluded.last_attendance_date
+    )
+    db.execute(stmt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Davomat tahlili jadvallarini qayta hisoblash")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild-streaks")
+    parser.parse_args()
+
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        rebuild_streaks(db)
+        db.commit()
+    print("Absence streak'lar qayta hisoblandi")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import Table, delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models import (
+    Groups,
+    Students,
+    Teachers,
+    student_group_association,
+    teacher_group_association,
+    teacher_students_association
+)
+from app.db.touch import touch
+
+
+"""
+Ko'p-ko'p bog'lanish jadvallari (student_group_association va boshqalar) ustida to'g'ridan-to'g'ri amallar.
+Relationship kolleksiyasini yuklab, tozalab, qayta yozish o'rniga faqat qo'shilgan va olib tashlangan
+qatorlar SQL da yoziladi. Bog'lanish o'zgargan har ikki tomonning updated_at i yangilanadi (touch),
+shunda detail ETag / Last-Modified lari ham o'zgaradi. Commit chaqiruvchi tomonidan qilinadi.
+"""
+
+
+class Membership:
+    # Bog'lanishning bir tomoni: masalan Teachers.teacher_groups - egasi teachers_id, a'zo groups_id
+    def __init__(self, table: Table, owner_column: str, member_column: str, owner_model, member_model,
+                 namespaces: Sequence[str] = ()):
+        self.table = table
+        self.owner_column = owner_column
+        self.member_column = member_column
+        self.owner_model = owner_model
+        self.member_model = member_model
+        self.namespaces = namespaces  # O'zgarganda tozalanadigan kesh namespace lari
+
+    @property
+    def owner(self):
+        return self.table.c[self.owner_column]
+
+    @property
+    def member(self):
+        return self.table.c[self.member_column]
+
+    def touch(self, db: Session, owner_ids: Iterable[int], member_ids: Iterable[int]):
+        touch(db, self.owner_model, owner_ids)
+        touch(db, self.member_model, member_ids)
+
+
+# TeacherScope guruh bog'lanishlaridan yig'iladi, shuning uchun ular "scopes" keshini tozalaydi
+TEACHER_GROUPS = Membership(teacher_group_association, "teachers_id", "groups_id", Teachers, Groups, ("scopes",))
+TEACHER_STUDENTS = Membership(teacher_students_association, "teachers_id", "students_id", Teachers, Students)
+STUDENT_GROUPS = Membership(student_group_association, "students_id", "groups_id", Students, Groups, ("scopes",))
+STUDENT_TEACHERS = Membership(teacher_students_association, "students_id", "teachers_id", Students, Teachers)
+
+
+def touch_members(db: Session, membership: Membership, owner_id: int):
+    # Egasi o'chirilishidan oldin: bog'lanish qatorlari cascade bilan o'chadi, a'zolar javobi esa o'zgaradi
+    touch(db, membership.member_model, select(membership.member).where(membership.owner == owner_id))
+
+
+def add_members(db: Session, membership: Membership, owner_id: int, member_ids: Iterable[int]) -> List[int]:
+    """
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING: faqat haqiqatan qo'shilgan a'zo id lari qaytadi.
+    Mavjud bo'lmagan egasi/a'zo id lari SELECT da tushib qoladi, shuning uchun FK xatosi bo'lmaydi.
+    """
+    member_ids = set(member_ids)
+    if not member_ids:
+        return []
+
+    owner_model, member_model = membership.owner_model, membership.member_model
+    stmt = pg_insert(membership.table).from_select(
+        [membership.owner_column, membership.member_column],
+        select(owner_model.id, member_model.id).where(owner_model.id == owner_id, member_model.id.in_(member_ids))
+    ).on_conflict_do_nothing().returning(membership.member)
+    added = sorted(db.execute(stmt).scalars())
+    if added:
+        membership.touch(db, [owner_id], added)
+    return added
+
+
+def remove_members(db: Session, membership: Membership, owner_id: int, member_ids: Iterable[int]) -> List[int]:
+    # DELETE ... RETURNING: faqat haqiqatan o'chirilgan a'zo id lari qaytadi
+    member_ids = set(member_ids)
+    if not member_ids:
+        return []
+
+    stmt = delete(membership.table).where(
+        membership.owner == owner_id, membership.member.in_(member_ids)
+    ).returning(membership.member)
+    removed = sorted(db.execute(stmt).scalars())
+    if removed:
+        membership.touch(db, [owner_id], removed)
+    return removed
+
+
+def set_members(db: Session, membership: Membership, owner_id: int,
+                member_ids: Iterable[int]) -> Tuple[List[int], List[int]]:
+    """
+    Egasining a'zolarini member_ids ga tenglashtiradi. Kolleksiya yuklanmaydi: ro'yxatda yo'qlari
+    DELETE ... RETURNING bilan o'chiriladi, yangilari add_members bilan qo'shiladi, qolganlariga tegilmaydi.
+    (qo'shilgan, o'chirilgan) id larni qaytaradi.
+    """
+    member_ids = set(member_ids)
+    stmt = delete(membership.table).where(membership.owner == owner_id)
+    if member_ids:
+        stmt = stmt.where(membership.member.not_in(member_ids))
+    removed = sorted(db.execute(stmt.returning(membership.member)).scalars())
+    if removed:
+        membership.touch(db, [owner_id], removed)
+    return add_members(db, membership, owner_id, member_ids), removed
+
+
+def sync_memberships(db: Session, membership: Membership, desired: Dict[int, Iterable[int]]) -> Tuple[int, int]:
+    """
+    desired: egasi id -> bo'lishi kerak bo'lgan a'zo id lar. Har bir egasi uchun ro'yxatda yo'q qatorlar
+    bitta DELETE bilan o'chiriladi, yangilari bitta INSERT ... ON CONFLICT DO NOTHING bilan qo'shiladi,
+    o'zgarmagan qatorlarga tegilmaydi. (qo'shilgan, o'chirilgan) qatorlar sonini qaytaradi.
+    """
+    if not desired:
+        return 0, 0
+
+    owner_column, member_column = membership.owner_column, membership.member_column
+    owner, member = membership.owner, membership.member
+    pairs = sorted({(owner_id, member_id) for owner_id, member_ids in desired.items() for member_id in member_ids})
+
+    stmt = delete(membership.table).where(owner.in_(list(desired)))
+    if pairs:
+        stmt = stmt.where(tuple_(owner, member).not_in(pairs))
+    removed = db.execute(stmt.returning(owner, member)).all()
+
+    added = []
+    if pairs:
+        added = db.execute(pg_insert(membership.table).values([
+            {owner_column: owner_id, member_column: member_id} for owner_id, member_id in pairs
+        ]).on_conflict_do_nothing().returning(owner, member)).all()
+
+    changed = added + removed
+    membership.touch(db, [row[0] for row in changed], [row[1] for row in changed])
+    return len(added), len(removed)
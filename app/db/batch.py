@@ -0,0 +1,225 @@
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.cache import invalidate
+from app.core.config import settings
+from app.db.associations import TEACHER_GROUPS, TEACHER_STUDENTS, sync_memberships
+from app.db.models import Groups, Students, Subjects, Teachers
+from app.db.touch import touch
+from app.enums import BatchModeEnum
+
+
+"""
+Teacher/Group/Subject uchun partiyaviy (batch) yaratish va yangilash.
+Butun partiya uchun har bir bog'liq jadval (subject, group, student) bir marta tekshiriladi,
+unique ustunlar bitta so'rov bilan solishtiriladi, yozish executemany / INSERT ... RETURNING bilan
+bajariladi va bitta commit qilinadi.
+
+- atomic: bitta element xato bo'lsa hech narsa saqlanmaydi, 400 bilan har bir element natijasi qaytadi.
+- best_effort: xato elementlar o'tkazib yuboriladi, qolganlari saqlanadi.
+Tekshiruvdan keyin parallel so'rov unique qiymatni egallab olsa (IntegrityError), bu ham shu elementning
+xatosi sifatida qaytadi, 500 emas.
+"""
+
+
+class BatchSpec:
+    def __init__(self, model, label: str, namespaces: Sequence[str], references: Sequence[tuple] = (),
+                 unique: Sequence[str] = (), associations: Optional[dict] = None):
+        self.model = model
+        self.label = label  # Xatolik matnlari uchun ("Teacher topilmadi")
+        self.namespaces = namespaces  # Saqlangandan keyin tozalanadigan kesh namespace lari
+        self.references = references  # (maydon, model, label) - skalyar id yoki id lar ro'yxati
+        self.unique = unique
+        self.associations = associations or {}  # maydon -> Membership
+
+
+TEACHER_BATCH = BatchSpec(
+    Teachers, "Teacher", ("subjects", "scopes"),
+    references=[("teacher_subject_id", Subjects, "Subject"), ("teacher_groups", Groups, "Group"),
+                ("teacher_students", Students, "Student")],
+    unique=["teacher_phone_number", "teacher_email"],
+    associations={"teacher_groups": TEACHER_GROUPS, "teacher_students": TEACHER_STUDENTS}
+)
+GROUP_BATCH = BatchSpec(
+    Groups, "Group", ("groups", "subjects", "scopes"),
+    references=[("group_subject_id", Subjects, "Subject")]
+)
+SUBJECT_BATCH = BatchSpec(Subjects, "Subject", ("subjects",))
+
+
+def _ids(value) -> set:
+    if value is None:
+        return set()
+    return set(value) if isinstance(value, list) else {value}
+
+
+def _check_size(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="Partiya bo'sh")
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Partiyada ko'pi bilan {settings.BATCH_MAX_ITEMS} ta element bo'lishi mumkin")
+
+
+def _validate(db: Session, spec: BatchSpec, items: List[BaseModel], fields: List[set],
+              row_ids: List[Optional[int]]) -> Dict[int, List[str]]:
+    # fields[i] - i-elementda yuborilgan maydonlar, row_ids[i] - yangilanayotgan yozuv id si (yaratishda None)
+    errors = defaultdict(list)
+
+    for field, model, label in spec.references:
+        requested = set().union(*(_ids(getattr(item, field)) for item, sent in zip(items, fields) if field in sent))
+        if not requested:
+            continue
+        found = set(db.execute(select(model.id).where(model.id.in_(requested))).scalars())
+        for index, (item, sent) in enumerate(zip(items, fields)):
+            missing = sorted(_ids(getattr(item, field)) - found) if field in sent else []
+            if missing:
+                errors[index].append(f"{label} topilmadi: {missing}")
+
+    for field in spec.unique:
+        values = [getattr(item, field) if field in sent else None for item, sent in zip(items, fields)]
+        requested = {value for value in values if value is not None}
+        if not requested:
+            continue
+        column = getattr(spec.model, field)
+        owners = dict(db.execute(select(column, spec.model.id).where(column.in_(requested))).all())
+        seen = Counter()
+        for index, value in enumerate(values):
+            if value is None:
+                continue
+            seen[value] += 1
+            if seen[value] > 1:
+                errors[index].append(f"{field} partiyada takrorlangan")
+            elif value in owners and owners[value] != row_ids[index]:
+                errors[index].append(f"{field} allaqachon mavjud")
+
+    return errors
+
+
+def _reject(mode: BatchModeEnum, count: int, errors: Dict[int, List[str]]):
+    raise HTTPException(status_code=400, detail={
+        "mode": mode.value,
+        "succeeded": 0,
+        "failed": len(errors),
+        "items": [{"index": index, "id": None, "ok": False, "errors": errors.get(index, [])} for index in range(count)]
+    })
+
+
+def _write(db: Session, write, valid: List[int], errors: Dict[int, List[str]]) -> Dict[int, int]:
+    """
+    Partiya bitta savepoint ichida yoziladi. IntegrityError bo'lsa savepoint qaytariladi va elementlar
+    bittadan o'z savepoint'ida qayta yoziladi: cheklovni buzgan element errors ga tushadi, qolganlari saqlanadi.
+    """
+    try:
+        with db.begin_nested():
+            return dict(zip(valid, write(valid)))
+    except IntegrityError:
+        pass
+
+    ids = {}
+    for index in valid:
+        try:
+            with db.begin_nested():
+                ids[index] = write([index])[0]
+        except IntegrityError as e:
+            errors[index].append(f"Bazada cheklov buzildi: {str(e.orig).splitlines()[0]}")
+    return ids
+
+
+def _finish(db: Session, spec: BatchSpec, mode: BatchModeEnum, count: int, errors: Dict[int, List[str]],
+            write) -> dict:
+    if errors and mode == BatchModeEnum.atomic:
+        _reject(mode, count, errors)
+
+    valid = [index for index in range(count) if index not in errors]
+    ids = _write(db, write, valid, errors) if valid else {}
+    if errors and mode == BatchModeEnum.atomic:
+        db.rollback()
+        _reject(mode, count, errors)
+
+    valid = [index for index in valid if index not in errors]
+    db.commit()
+    if valid:
+        invalidate(*spec.namespaces)
+
+    return {
+        "mode": mode.value,
+        "succeeded": len(valid),
+        "failed": len(errors),
+        "items": [
+            {"index": index, "id": ids.get(index), "ok": index not in errors, "errors": errors.get(index, [])}
+            for index in range(count)
+        ]
+    }
+
+
+def create_batch(db: Session, spec: BatchSpec, items: List[BaseModel], mode: BatchModeEnum = BatchModeEnum.atomic):
+    _check_size(items)
+    fields = [set(type(item).model_fields) for item in items]
+    errors = _validate(db, spec, items, fields, [None] * len(items))
+
+    def write(valid: List[int]) -> List[int]:
+        rows = [items[index].model_dump(exclude=set(spec.associations)) for index in valid]
+        # sort_by_parameter_order: qaytgan id lar rows tartibida bo'ladi
+        new_ids = db.execute(
+            insert(spec.model).returning(spec.model.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+
+        for field, membership in spec.associations.items():
+            links = [
+                {membership.owner_column: new_id, membership.member_column: member_id}
+                for index, new_id in zip(valid, new_ids)
+                for member_id in _ids(getattr(items[index], field))
+            ]
+            if links:
+                db.execute(insert(membership.table), links)
+                touch(db, membership.member_model, [link[membership.member_column] for link in links])
+        return new_ids
+
+    return _finish(db, spec, mode, len(items), errors, write)
+
+
+def update_batch(db: Session, spec: BatchSpec, items: List[BaseModel], mode: BatchModeEnum = BatchModeEnum.atomic):
+    # items - har birida id va faqat o'zgartiriladigan maydonlar (exclude_unset)
+    _check_size(items)
+    fields = [item.model_fields_set - {"id"} for item in items]
+    row_ids = [item.id for item in items]
+    errors = _validate(db, spec, items, fields, row_ids)
+
+    existing = set(db.execute(select(spec.model.id).where(spec.model.id.in_(row_ids))).scalars())
+    seen = Counter()
+    for index, row_id in enumerate(row_ids):
+        seen[row_id] += 1
+        if row_id not in existing:
+            errors[index].append(f"{spec.label} topilmadi: {row_id}")
+        elif seen[row_id] > 1:
+            errors[index].append("id partiyada takrorlangan")
+
+    def write(valid: List[int]) -> List[int]:
+        rows = []
+        memberships = defaultdict(dict)
+        for index in valid:
+            data = items[index].model_dump(include=fields[index])
+            for field in spec.associations:
+                if field in data:
+                    memberships[field][row_ids[index]] = _ids(data.pop(field))
+            if data:
+                rows.append({"id": row_ids[index], **data})
+
+        if rows:
+            # Skalyar bog'lanish (teacher_subject_id ...) o'zgarsa, eski yozuv javobidan bu qator chiqib ketadi
+            for field, model, _ in spec.references:
+                changed = [row["id"] for row in rows if field in row]
+                if changed and field not in spec.associations:
+                    touch(db, model, select(getattr(spec.model, field)).where(spec.model.id.in_(changed)))
+            db.execute(update(spec.model), rows)  # Primary key bo'yicha executemany UPDATE
+        for field, desired in memberships.items():
+            sync_memberships(db, spec.associations[field], desired)
+        return [row_ids[index] for index in valid]
+
+    return _finish(db, spec, mode, len(items), errors, write)
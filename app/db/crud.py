@@ -1,5 +1,21 @@
 from fastapi import HTTPException
-from app.core.security import hash_password
+from app.core.config import settings
+from app.core.security import hash_password, hash_token, revoked_tokens, sync_revoked_tokens
+from app.core.cache import cached, invalidate, invalidate_user
+from app.core.conditional import Version
+from app.core.scope import get_teacher_scope
+from app.core.text import fold_uz, normalize_phone
+from app.core.utils import paginate, serialize_page
+from app.db.loaders import projection
+from app.db.associations import (
+    Membership, STUDENT_GROUPS, STUDENT_TEACHERS, TEACHER_GROUPS, TEACHER_STUDENTS,
+    add_members, remove_members, set_members, touch_members
+)
+from app.db.analytics import rebuild_streaks, record_submission
+from app.db.ledger import apply_payment_delta, month_start, payment_row
+from app.db.rollups import apply_attendance_delta, attendance_row, subtract_attendance
+from app.db.touch import touch
+from app.enums import ReportPeriodEnum
 
 from app.db.models import (
     Teachers,
@@ -9,35 +25,56 @@ from app.db.models import (
     Payments,
     Attendance,
     Admins,
-    User
+    User,
+    AttendanceStreak,
+    PaymentMonthly,
+    PaymentStudentTotal,
+    PaymentReview,
+    RefreshToken,
+    RevokedToken,
+    student_group_association,
+    teacher_group_association,
+    teacher_students_association
 )
 from app.db.schemas import (
     TeacherBase,
     TeacherCreate,
     TeacherDetail,
     TeacherUpdate,
+    TeacherOutput,
 
     SubjectBase,
     SubjectDetail,
     SubjectCreate,
+    SubjectResponse,
 
     StudentBase,
     StudentDetail,
     StudentCreate,
     StudentUpdate,
+    StudentGroupInfo,
 
     GroupBase,
     GroupDetail,
+    GroupOutput,
 
     AttendanceBase,
     AttendanceDetail,
     AttendanceCreate,
     AttendanceUpdate,
+    AttendanceFilter,
+    AttendanceReportFilter,
+    AttendanceCorrection,
+    AttendancesOutput,
 
     PaymentDetail,
     PaymentCreate,
     PaymentBase,
     PaymentUpdate,
+    PaymentFilter,
+    PaymentReviewResolve,
+    Debtor,
+    PaymentsOutput,
 
     GroupUpdate,
     GroupCreate,
@@ -49,11 +86,15 @@ from app.db.schemas import (
     AdminUpdate,
 
     UserCreate,
+    UserOutput,
     UserUpdate
 )
-from datetime import datetime, timedelta, date
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from datetime import datetime, timedelta, date, timezone
+from sqlalchemy import select, or_, cast, func, literal, literal_column, true, Date
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Optional
 import logging
 import pytz
 
@@ -61,6 +102,48 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# ------------------- Bog'lanishlar (association) -----------------------
+
+def raise_not_linked(db: Session, checks: list, status_code: int, detail: str):
+    """
+    DELETE ... RETURNING hech narsa qaytarmaganda sababini aniqlaydi: checks dagi (model, id, xabar)
+    yozuvlardan biri mavjud bo'lmasa 404, aks holda bog'lanish yo'q. Muvaffaqiyatli yo'lda bu so'rovlar bajarilmaydi.
+    """
+    for model, object_id, missing_detail in checks:
+        if not db.query(model.id).filter(model.id == object_id).first():
+            raise HTTPException(status_code=404, detail=missing_detail)
+    raise HTTPException(status_code=status_code, detail=detail)
+
+
+def _require_owner(db: Session, membership: Membership, owner_id: int):
+    model = membership.owner_model
+    if not db.query(model.id).filter(model.id == owner_id).first():
+        raise HTTPException(status_code=404, detail=f"{model.__name__.rstrip('s')} not found !")
+
+
+def assign_members(db: Session, membership: Membership, owner_id: int, member_ids: List[int]):
+    # changed - yangi bog'langanlar, unchanged - allaqachon bog'langan yoki mavjud bo'lmagan id lar
+    added = add_members(db, membership, owner_id, member_ids)
+    if not added:
+        _require_owner(db, membership, owner_id)
+
+    db.commit()
+    if added:
+        invalidate(*membership.namespaces)
+    return {"owner_id": owner_id, "changed": added, "unchanged": sorted(set(member_ids) - set(added))}
+
+
+def unassign_members(db: Session, membership: Membership, owner_id: int, member_ids: List[int]):
+    removed = remove_members(db, membership, owner_id, member_ids)
+    if not removed:
+        _require_owner(db, membership, owner_id)
+
+    db.commit()
+    if removed:
+        invalidate(*membership.namespaces)
+    return {"owner_id": owner_id, "changed": removed, "unchanged": sorted(set(member_ids) - set(removed))}
+
+
 # ------------------- Teacher CRUD -----------------------
 
 def create_teachers(db: Session, data: TeacherCreate):
@@ -79,34 +162,43 @@ def create_teachers(db: Session, data: TeacherCreate):
         students = db.query(Students).filter(Students.id.in_(data.teacher_students)).all()
         teacher.teacher_students.extend(students)
 
+    # Yangi ustoz shu guruh va studentlarning detail javobida ham ko'rinadi
+    touch(db, Groups, data.teacher_groups or [])
+    touch(db, Students, data.teacher_students or [])
     db.add(teacher)
     db.commit()
+    invalidate("subjects", "scopes")
     db.refresh(teacher)
     return teacher
 
 
-def get_teachers(db: Session):
-    teachers = db.query(Teachers).options(
-        joinedload(Teachers.teacher_groups),
-        joinedload(Teachers.teacher_subject),
-        joinedload(Teachers.teacher_students),
-        joinedload(Teachers.attendance)
-    ).all()
+def get_teachers(db: Session, limit: int = settings.PAGE_SIZE_DEFAULT, after: Optional[int] = None,
+                 schema=TeacherOutput):
+    query = db.query(Teachers).options(*projection(Teachers, schema))
+    page = paginate(query, Teachers, limit, after)
 
-    if not teachers:
+    if not page["items"] and after is None:
         raise HTTPException(status_code=404, detail="No teachers found")
 
-    return teachers
+    return page
 
 
 def get_teacher(db: Session, teacher_id: int):
-    return db.query(Teachers).options(
-        joinedload(Teachers.teacher_groups),
+    teacher = db.query(Teachers).options(
+        selectinload(Teachers.teacher_groups),
         joinedload(Teachers.teacher_subject),
-        joinedload(Teachers.teacher_students),
-        joinedload(Teachers.attendance)
+        selectinload(Teachers.teacher_students)
     ).filter(Teachers.id == teacher_id).first()
 
+    if not teacher:
+        return None
+
+    # Davomat tarixi to'liq emas, faqat oxirgi yozuvlar va umumiy hisob bilan qaytariladi
+    set_committed_value(teacher, "attendance",
+                        get_recent_attendance(db, Attendance.teacher_id == teacher_id))
+    teacher.attendance_summary = get_attendance_summary(db, Attendance.teacher_id == teacher_id)
+    return teacher
+
 
 def update_teacher(db: Session, teacher_id: int, data_update: TeacherUpdate):
     teacher = db.query(Teachers).filter(Teachers.id == teacher_id).first()
@@ -115,18 +207,21 @@ def update_teacher(db: Session, teacher_id: int, data_update: TeacherUpdate):
 
     updated_data = data_update.dict(exclude_unset=True)  # Faqat o'zgartirilgan maydonni oladi
 
+    # Bog'lanishlar to'liq qayta yozilmaydi: faqat qo'shilgan va olib tashlangan qatorlar yoziladi
     if "teacher_groups" in updated_data:
-        group_ids = updated_data.pop("teacher_groups")
-        teacher.teacher_groups = db.query(Groups).filter(Groups.id.in_(group_ids)).all()
+        set_members(db, TEACHER_GROUPS, teacher_id, updated_data.pop("teacher_groups") or [])
 
     if "teacher_students" in updated_data:
-        student_ids = updated_data.pop("teacher_students")
-        teacher.teacher_students = db.query(Students).filter(Students.id.in_(student_ids)).all()
+        set_members(db, TEACHER_STUDENTS, teacher_id, updated_data.pop("teacher_students") or [])
+
+    if updated_data.get("teacher_subject_id", teacher.teacher_subject_id) != teacher.teacher_subject_id:
+        touch(db, Subjects, [teacher.teacher_subject_id])  # Eski fan javobidan ustoz chiqib ketadi
 
     for key, value in updated_data.items():
         setattr(teacher, key, value)
 
     db.commit()
+    invalidate("subjects", "scopes")
     db.refresh(teacher)
     return teacher
 
@@ -137,41 +232,33 @@ def delete_teacher(db: Session, teacher_id: int):
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found !")
 
+    # Teachers.attendance passive_deletes emas: ORM davomat yozuvlarida teacher_id ni NULL qiladi (ular o'chmaydi),
+    # guruh rollup'idagi shu ustoz qatorlari esa FK CASCADE bilan o'chadi - bu rebuild() natijasi bilan bir xil.
+    # Shuning uchun bu yerda subtract_attendance chaqirilmaydi (student rollup'idan ayirish xato bo'lardi)
+    touch_members(db, TEACHER_GROUPS, teacher_id)
+    touch_members(db, TEACHER_STUDENTS, teacher_id)
+    touch(db, Subjects, [teacher.teacher_subject_id])
     db.delete(teacher)
     db.commit()
+    invalidate("subjects", "scopes")
     return teacher
 
 
 def delete_group_from_teacher(teacher_id: int, group_id: int, db: Session):
-    teacher = db.query(Teachers).filter(Teachers.id == teacher_id).first()
-    if not teacher:
-        raise HTTPException(status_code=404, detail="Teacher topilmadi !")
+    if not remove_members(db, TEACHER_GROUPS, teacher_id, [group_id]):
+        raise_not_linked(db, [(Teachers, teacher_id, "Teacher topilmadi !"), (Groups, group_id, "Group topilmadi !")],
+                         400, "Group Teacher-ga bog'lanmagan !")
 
-    group = db.query(Groups).filter(Groups.id == group_id).first()
-    if not group:
-        raise HTTPException(status_code=404, detail="Group topilmadi !")
-
-    if group not in teacher.teacher_groups:
-        raise HTTPException(status_code=400, detail="Group Teacher-ga bog'lanmagan !")
-
-    teacher.teacher_groups.remove(group)
     db.commit()
+    invalidate("scopes")
     return {"detail": f"Group {group_id} Teacher {teacher_id} da muvaffaqiyatli uzildi !"}
 
 
 def delete_student_from_teacher(teacher_id: int, student_id: int, db: Session):
-    teacher = db.query(Teachers).filter(Teachers.id == teacher_id).first()
-    if not teacher:
-        raise HTTPException(status_code=404, detail="Teacher topilmadi !")
+    if not remove_members(db, TEACHER_STUDENTS, teacher_id, [student_id]):
+        raise_not_linked(db, [(Teachers, teacher_id, "Teacher topilmadi !"), (Students, student_id, "Student topilmadi !")],
+                         400, "Student Teacher-ga bog'lanmagan !")
 
-    student = db.query(Students).filter(Students.id == student_id).first()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student topilmadi !")
-
-    if student not in teacher.teacher_students:
-        raise HTTPException(status_code=400, detail="Student Teacher-ga bog'lanmagan !")
-
-    teacher.teacher_students.remove(student)
     db.commit()
     return {"detail": f"Student {student_id} Teacher {teacher_id} da muvaffaqiyatli uzildi !"}
 
@@ -190,27 +277,39 @@ def create_student(db: Session, data: StudentCreate):
         groups = db.query(Groups).filter(Groups.id.in_(data.student_groups)).all()
         student.student_groups.extend(groups)
 
+    touch(db, Teachers, data.student_teachers or [])
+    touch(db, Groups, data.student_groups or [])
     db.add(student)
     db.commit()
+    invalidate("scopes")
     db.refresh(student)
     return student
 
 
-def get_students(db: Session):
-    return db.query(Students).options(
-        joinedload(Students.student_groups),
-        joinedload(Students.student_teachers)
-    ).all()
+def get_students(db: Session, limit: int = settings.PAGE_SIZE_DEFAULT, after: Optional[int] = None,
+                 schema=StudentGroupInfo):
+    query = db.query(Students).options(*projection(Students, schema))
+    return paginate(query, Students, limit, after)
 
 
 def get_student(db: Session, student_id: int):
-    return db.query(Students).options(
-        joinedload(Students.student_groups),
-        joinedload(Students.student_attendance),
-        joinedload(Students.student_payment),
-        joinedload(Students.student_teachers)
+    student = db.query(Students).options(
+        selectinload(Students.student_groups),
+        selectinload(Students.student_teachers)
     ).filter(Students.id == student_id).first()
 
+    if not student:
+        return None
+
+    # Davomat va to'lovlar tarixi to'liq emas, faqat oxirgi yozuvlar va umumiy hisob bilan qaytariladi
+    set_committed_value(student, "student_attendance",
+                        get_recent_attendance(db, Attendance.student_id == student_id))
+    set_committed_value(student, "student_payment",
+                        get_recent_payments(db, Payments.student_id == student_id))
+    student.attendance_summary = get_attendance_summary(db, Attendance.student_id == student_id)
+    student.payment_summary = get_payment_summary(db, Payments.student_id == student_id)
+    return student
+
 
 def update_student(db: Session, student_id: int, data_update: StudentUpdate):
     student = db.query(Students).filter(Students.id == student_id).first()
@@ -222,61 +321,55 @@ def update_student(db: Session, student_id: int, data_update: StudentUpdate):
 
     for key, value in updated_data.items():
         if key == "student_groups":
-            groups = db.query(Groups).filter(Groups.id.in_(value)).all()
-            student.student_groups = groups
+            # Faqat qo'shilgan va olib tashlangan bog'lanishlar yoziladi
+            set_members(db, STUDENT_GROUPS, student_id, value or [])
         elif key == "student_teachers":
-            teachers = db.query(Teachers).filter(Teachers.id.in_(value)).all()
-            # Avvalgi o'qituvchilarni o'chirish (munosabatni tozalash)
-            student.student_teachers.clear()
-            # Keyin yangi o'qituvchilarni qo'shish
-            student.student_teachers.extend(teachers)
+            set_members(db, STUDENT_TEACHERS, student_id, value or [])
         else:
             setattr(student, key, value)
 
     db.commit()
+    invalidate("scopes")
     db.refresh(student)
     return student
 
 
 def delete_student(db: Session, student_id: int):
     student = db.query(Students).filter(Students.id == student_id).first()
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found!")
+
+    # Davomat va to'lovlar ON DELETE CASCADE bilan o'chadi, shuning uchun rollup va ledger'dan oldindan ayiriladi
+    subtract_attendance(db, Attendance.student_id == student_id)
+    apply_payment_delta(db, removed=db.query(
+        Payments.student_id, Payments.payment_date, Payments.payment_amount
+    ).filter(Payments.student_id == student_id).all())
+    # Guruh va ustoz detail javoblaridan student ham, uning davomati ham chiqib ketadi
+    touch_members(db, STUDENT_GROUPS, student_id)
+    touch_members(db, STUDENT_TEACHERS, student_id)
+    touch(db, Teachers, select(Attendance.teacher_id).where(Attendance.student_id == student_id))
     db.delete(student)
     db.commit()
+    invalidate("scopes")
     return student
 
 
 def delete_teacher_from_student(student_id: int, teacher_id: int, db: Session):
-    student = db.query(Students).filter(Students.id == student_id).first()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found !")
-
-    teacher = db.query(Teachers).filter(Teachers.id == teacher_id).first()
-    if not teacher:
-        raise HTTPException(status_code=404, detail="Teacher not found !")
-
-    if teacher not in student.student_teachers:
-        raise HTTPException(status_code=404, detail="This teacher is not assigned to the student !")
+    if not remove_members(db, STUDENT_TEACHERS, student_id, [teacher_id]):
+        raise_not_linked(db, [(Students, student_id, "Student not found !"), (Teachers, teacher_id, "Teacher not found !")],
+                         404, "This teacher is not assigned to the student !")
 
-    student.student_teachers.remove(teacher)
     db.commit()
     return {"detail": f"Teacher {teacher_id} has been unassigned from student {student_id}"}
 
 
-def delete_group_from_student(student_id: int, group_id: int, db=Session):
-    student = db.query(Students).filter(Students.id == student_id).first()
-
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found !")
+def delete_group_from_student(student_id: int, group_id: int, db: Session):
+    if not remove_members(db, STUDENT_GROUPS, student_id, [group_id]):
+        raise_not_linked(db, [(Students, student_id, "Student not found !"), (Groups, group_id, "Group not found !")],
+                         400, "Group not linked to this student")
 
-    group = db.query(Groups).filter(Groups.id == group_id).first()
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found !")
-
-    if group not in student.student_groups:
-        raise HTTPException(status_code=400, detail="Group not linked to this student")
-
-    student.student_groups.remove(group)
     db.commit()
+    invalidate("scopes")
     return {"detail": f"Group {group_id} has been unassigned from student {student_id}"}
 
 
@@ -286,25 +379,20 @@ def create_group(db: Session, data: GroupCreate):
     group = Groups(**data.model_dump())
     db.add(group)
     db.commit()
+    invalidate("groups", "subjects")
     db.refresh(group)
     return group
 
 
-def get_groups(db: Session):
-    return db.query(Groups).options(
-        joinedload(Groups.group_subject),
-        joinedload(Groups.attendance),
-        joinedload(Groups.group_teachers),
-        joinedload(Groups.group_students)
-    ).all()
+def get_groups(db: Session, limit: int = settings.PAGE_SIZE_DEFAULT, after: Optional[int] = None,
+               schema=GroupOutput):
+    query = db.query(Groups).options(*projection(Groups, schema))
+    return serialize_page(paginate(query, Groups, limit, after), schema)
 
 
 def get_group(db: Session, group_id: int):
     return db.query(Groups).options(
-        joinedload(Groups.group_subject),
-        joinedload(Groups.attendance),
-        joinedload(Groups.group_teachers),
-        joinedload(Groups.group_students)
+        *projection(Groups, GroupDetail)
     ).filter(Groups.id == group_id).first()
 
 
@@ -316,10 +404,14 @@ def update_group(db: Session, group_id: int, data_update: GroupUpdate):
 
     update_data = data_update.dict(exclude_unset=True)
 
+    if update_data.get("group_subject_id", group.group_subject_id) != group.group_subject_id:
+        touch(db, Subjects, [group.group_subject_id])  # Eski fan javobidan guruh chiqib ketadi
+
     for key, value in update_data.items():
         setattr(group, key, value)
 
     db.commit()
+    invalidate("groups", "subjects", "scopes")
     db.refresh(group)
     return group
 
@@ -330,8 +422,19 @@ def delete_group(db: Session, group_id: int):
     if not group:
         raise HTTPException(status_code=404, detail="Group not found !")
 
+    # Guruh davomati ON DELETE CASCADE bilan o'chadi - student rollup'idan oldindan ayiriladi
+    subtract_attendance(db, Attendance.group_id == group_id)
+    # Guruh a'zolari, fani va cascade bilan o'chadigan davomat egalarining detail javoblari o'zgaradi
+    touch(db, Teachers, select(teacher_group_association.c.teachers_id)
+          .where(teacher_group_association.c.groups_id == group_id)
+          .union(select(Attendance.teacher_id).where(Attendance.group_id == group_id)))
+    touch(db, Students, select(student_group_association.c.students_id)
+          .where(student_group_association.c.groups_id == group_id)
+          .union(select(Attendance.student_id).where(Attendance.group_id == group_id)))
+    touch(db, Subjects, [group.group_subject_id])
     db.delete(group)
     db.commit()
+    invalidate("groups", "subjects", "scopes")
     return group
 
 
@@ -340,20 +443,61 @@ def delete_group(db: Session, group_id: int):
 def create_payment(db: Session, data: PaymentCreate):
     payment = Payments(**data.model_dump())
     db.add(payment)
+    apply_payment_delta(db, added=[payment_row(payment)])
     db.commit()
     db.refresh(payment)
     return payment
 
 
-def get_payments(db: Session):
-    return db.query(Payments).options(
-        joinedload(Payments.student)
-    ).all()
+def get_recent_payments(db: Session, *criteria, limit: int = settings.DETAIL_HISTORY_LIMIT):
+    return db.query(Payments).filter(*criteria).order_by(
+        Payments.payment_date.desc(), Payments.id.desc()
+    ).limit(limit).all()
+
+
+def get_payment_summary(db: Session, *criteria):
+    count, total_amount, last_payment_date = db.query(
+        func.count(Payments.id),
+        func.coalesce(func.sum(Payments.payment_amount), 0),
+        func.max(Payments.payment_date)
+    ).filter(*criteria).one()
+    return {"count": count, "total_amount": total_amount, "last_payment_date": last_payment_date}
+
+
+def payment_filters(filters: Optional[PaymentFilter]):
+    # Query parametrlarini SQL shartlariga aylantiradi (ix_payments_* indekslari ishlatiladi)
+    criteria = []
+    if filters is None:
+        return criteria
+
+    if filters.student_id is not None:
+        criteria.append(Payments.student_id == filters.student_id)
+    if filters.group_id is not None:
+        criteria.append(Payments.student_id.in_(
+            select(student_group_association.c.students_id)
+            .where(student_group_association.c.groups_id == filters.group_id)
+        ))
+    if filters.date_from is not None:
+        criteria.append(Payments.payment_date >= filters.date_from)
+    if filters.date_to is not None:
+        criteria.append(Payments.payment_date <= filters.date_to)
+    if filters.amount_min is not None:
+        criteria.append(Payments.payment_amount >= filters.amount_min)
+    if filters.amount_max is not None:
+        criteria.append(Payments.payment_amount <= filters.amount_max)
+    return criteria
+
+
+def get_payments(db: Session, limit: int = settings.PAGE_SIZE_DEFAULT, after: Optional[int] = None,
+                 filters: Optional[PaymentFilter] = None, descending: bool = False, schema=PaymentsOutput):
+    query = db.query(Payments).options(*projection(Payments, schema)).filter(*payment_filters(filters))
+    return paginate(query, Payments, limit, after, descending)
 
 
 def get_payment(db: Session, payment_id: int):
+    # PaymentDetail student.student_groups ni ham talab qiladi - lazy load bo'lmasligi uchun oldindan yuklanadi
     return db.query(Payments).options(
-        joinedload(Payments.student)
+        *projection(Payments, PaymentDetail)
     ).filter(Payments.id == payment_id).first()
 
 
@@ -364,10 +508,12 @@ def update_payment(db: Session, payment_id: int, data_update: PaymentUpdate):
         raise HTTPException(status_code=404, detail="Payment not found !")
 
     update_data = data_update.dict(exclude_unset=True)
+    old_row = payment_row(payment)
 
     for key, value in update_data.items():
         setattr(payment, key, value)
 
+    apply_payment_delta(db, added=[payment_row(payment)], removed=[old_row])
     db.commit()
     db.refresh(payment)
     return payment
@@ -379,65 +525,199 @@ def delete_payment(db: Session, payment_id: int):
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found !")
 
+    apply_payment_delta(db, removed=[payment_row(payment)])
+    touch(db, Students, [payment.student_id])
     db.delete(payment)
     db.commit()
     return payment
 
 
+def get_payment_reviews(db: Session, limit: int = settings.PAGE_SIZE_DEFAULT, after: Optional[int] = None):
+    return paginate(db.query(PaymentReview), PaymentReview, limit, after)
+
+
+def resolve_payment_review(db: Session, review_id: int, data: PaymentReviewResolve):
+    # Navbatdagi qatordan tanlangan student uchun to'lov yaratiladi va qator navbatdan o'chiriladi
+    review = db.query(PaymentReview).filter(PaymentReview.id == review_id).first()
+    if not review:
+        raise HTTPException(status_code=404, detail="Review item not found !")
+
+    if not db.query(Students.id).filter(Students.id == data.student_id).first():
+        raise HTTPException(status_code=404, detail="Student topilmadi !")
+
+    payment = Payments(
+        student_id=data.student_id,
+        payment_date=review.payment_date,
+        payment_amount=review.payment_amount
+    )
+    db.add(payment)
+    apply_payment_delta(db, added=[payment_row(payment)])
+    db.delete(review)
+    db.commit()
+    db.refresh(payment)
+    return payment
+
+
+def delete_payment_review(db: Session, review_id: int):
+    review = db.query(PaymentReview).filter(PaymentReview.id == review_id).first()
+    if not review:
+        raise HTTPException(status_code=404, detail="Review item not found !")
+
+    db.delete(review)
+    db.commit()
+    return review
+
+
+def get_revenue_by_month(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    # Faqat payment_monthly ledger jadvali o'qiladi (to'lovlari o'chirib yuborilgan oylar ko'rsatilmaydi)
+    query = db.query(PaymentMonthly).filter(PaymentMonthly.payments_count > 0)
+    if date_from is not None:
+        query = query.filter(PaymentMonthly.month >= month_start(date_from))
+    if date_to is not None:
+        query = query.filter(PaymentMonthly.month <= date_to)
+    return query.order_by(PaymentMonthly.month).all()
+
+
+def get_student_paid_totals(db: Session, limit: int = settings.PAGE_SIZE_DEFAULT, after: Optional[int] = None,
+                            student_id: Optional[int] = None):
+    # Faqat payment_student_totals ledger jadvali o'qiladi, student_id bo'yicha keyset pagination
+    query = db.query(PaymentStudentTotal).filter(PaymentStudentTotal.payments_count > 0)
+    if student_id is not None:
+        query = query.filter(PaymentStudentTotal.student_id == student_id)
+    if after is not None:
+        query = query.filter(PaymentStudentTotal.student_id > after)
+
+    rows = query.order_by(PaymentStudentTotal.student_id).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].student_id if len(rows) > limit else None
+    return {"items": rows[:limit], "next_cursor": next_cursor}
+
+
+def get_debtors(db: Session, period: date, limit: int = settings.PAGE_SIZE_DEFAULT, after: Optional[int] = None,
+                group_id: Optional[int] = None, schema=Debtor):
+    """
+    Hisob davri (period oyi) ichida birorta ham to'lov qilmagan, guruhga biriktirilgan studentlar.
+    Bitta anti-join (NOT EXISTS) so'rovi: har bir student uchun ix_payments_student_id_payment_date
+    indeksida bitta qidiruv bo'ladi, sahifalash esa students.id bo'yicha keyset.
+    """
+    period_start = month_start(period)
+    period_end = (period_start + timedelta(days=32)).replace(day=1)
+
+    membership = select(student_group_association.c.students_id).where(
+        student_group_association.c.students_id == Students.id
+    )
+    if group_id is not None:
+        membership = membership.where(student_group_association.c.groups_id == group_id)
+
+    paid = select(Payments.id).where(
+        Payments.student_id == Students.id,
+        Payments.payment_date >= period_start,
+        Payments.payment_date < period_end
+    )
+
+    query = db.query(Students).options(*projection(Students, schema)).filter(
+        membership.exists(),
+        ~paid.exists()
+    )
+    return paginate(query, Students, limit, after)
+
+
 # ------------------- Attendance CRUD -----------------------
 
-def create_attendance(db: Session, data: AttendanceCreate):
-    today = date.today()
+def get_attendance_roster(db: Session, student_ids: List[int]):
+    # Davomat javobi uchun mavjud studentlarning ismlari (a'zolik TeacherScope orqali tekshiriladi)
+    rows = db.query(
+        Students.id,
+        Students.student_firstname,
+        Students.student_lastname
+    ).filter(Students.id.in_(student_ids)).all()
+    return {row.id: row for row in rows}
 
-    teacher = db.query(Teachers).filter(Teachers.id == data.teacher_id).first()
-    if not teacher:
-        raise HTTPException(status_code=404, detail="Teacher not found !")
 
-    group = db.query(Groups).filter(Groups.id == data.group_id).first()
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found !")
+ATTENDANCE_KEY = ["student_id", "group_id", "attendance_date"]  # uq_attendance_student_group_date
 
-    if group not in teacher.teacher_groups:
+
+def _check_attendance_scope(db: Session, scope, group_id: int, student_ids):
+    if not scope.has_group(group_id):
+        if not db.query(Groups.id).filter(Groups.id == group_id).first():
+            raise HTTPException(status_code=404, detail="Group not found !")
         raise HTTPException(status_code=404, detail="Group has not been assigned to this teacher !")
 
-    subject = db.query(Subjects).filter(Subjects.id == group.group_subject_id).first()
-    if not subject:
+    if scope.group_subject_id(group_id) is None:
         raise HTTPException(status_code=404, detail="Subject not found !")
 
-    if teacher.teacher_subject_id != subject.id:
+    if not scope.teaches_group_subject(group_id):
         raise HTTPException(status_code=404, detail="Subject has not been assigned to this teacher !")
 
-    result = []
-    for item in data.attendance:
-        student = db.query(Students).filter(Students.id == item.student_id).first()
-        if not student:
-            continue
+    if scope.missing_students(group_id, student_ids):
+        raise HTTPException(status_code=404, detail="Student has not been assigned to this group")
 
-        if group not in student.student_groups:
-            raise HTTPException(status_code=404, detail="Student has not been assigned to this group")
 
-        existing = db.query(Attendance).filter_by(
-            student_id=item.student_id,
-            group_id=data.group_id,
-            attendance_date=today
-        ).first()
+def get_attendance_context(db: Session, teacher_id: int, group_id: int, student_ids: List[int]):
+    """
+    Davomat kiritishdan oldin ustoz, guruh, fan va studentlar bir-biriga mosligini tekshiradi.
+    Tekshiruvlar keshlangan TeacherScope ustida set orqali bajariladi. Bazada yo'q student id lari
+    (avvalgidek) e'tiborsiz qoldiriladi. Boshqa worker'dagi o'zgarish bu keshni tozalamaydi, shuning uchun
+    SCOPE_MAX_AGE_SECONDS dan eski scope ishlatilmaydi, tekshiruv o'tmasa esa scope bir marta qayta yuklanadi.
+    (scope, roster) qaytaradi; roster - faqat mavjud studentlar.
+    """
+    roster = get_attendance_roster(db, student_ids)
+    scope = get_teacher_scope(db, teacher_id, max_age=settings.SCOPE_MAX_AGE_SECONDS)
+    try:
+        _check_attendance_scope(db, scope, group_id, roster)
+    except HTTPException:
+        scope = get_teacher_scope(db, teacher_id, refresh=True)
+        _check_attendance_scope(db, scope, group_id, roster)
+
+    return scope, roster
 
-        if existing:
-            raise HTTPException(status_code=400, detail="Attendance has been confirmed for this date!")
 
-        attendance = Attendance(
-            teacher_id=data.teacher_id,
-            student_id=item.student_id,
-            group_id=data.group_id,
-            subject_id=subject.id,
-            attendance_date=today,
-            status=item.status.value
-        )
-        db.add(attendance)
+def create_attendance(db: Session, data: AttendanceCreate):
+    today = date.today()
+
+    # Bitta student ikki marta yuborilsa, oxirgi holati olinadi
+    items = {item.student_id: item for item in data.attendance}
+
+    scope, roster = get_attendance_context(db, data.teacher_id, data.group_id, list(items))
+    items = {student_id: item for student_id, item in items.items() if student_id in roster}
+    teacher = db.get(Teachers, data.teacher_id)
+    group = db.get(Groups, data.group_id)
+    subject = db.get(Subjects, scope.subject_id)
+
+    rows = []
+    result = []
+    for student_id, item in items.items():
+        student = roster[student_id]
+        rows.append({
+            "teacher_id": data.teacher_id,
+            "student_id": student_id,
+            "group_id": data.group_id,
+            "subject_id": scope.subject_id,
+            "attendance_date": today,
+            "status": item.status.value
+        })
         result.append({
             "student": f"{student.student_firstname} {student.student_lastname}",
             "status": f"{item.status.value}"
         })
+
+    # Barcha yozuvlar bitta multi-row INSERT bilan qo'shiladi. Takrorlanish unique indeks orqali
+    # tekshiriladi, shuning uchun parallel yuborilgan ikki so'rov ikkalasi ham yozib qo'ya olmaydi.
+    if rows:
+        inserted = db.execute(
+            pg_insert(Attendance).values(rows)
+            .on_conflict_do_nothing(index_elements=ATTENDANCE_KEY)
+            .returning(Attendance.student_id)
+        ).all()
+        if len(inserted) < len(rows):
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Attendance has been confirmed for this date!")
+
+        apply_attendance_delta(db, added=[
+            (row["teacher_id"], row["student_id"], row["group_id"], row["attendance_date"], row["status"])
+            for row in rows
+        ])
+        record_submission(db, data.group_id, today, {row["student_id"]: row["status"] for row in rows})
+
     db.commit()
     return {
         "teacher": f"{teacher.teacher_firstname} {teacher.teacher_lastname}",
@@ -450,13 +730,102 @@ def create_attendance(db: Session, data: AttendanceCreate):
     }
 
 
-def get_attendances(db: Session):
-    return db.query(Attendance).options(
-        joinedload(Attendance.teacher),
-        joinedload(Attendance.student),
-        joinedload(Attendance.group),
-        joinedload(Attendance.subject)
-    ).all()
+def correct_attendance(db: Session, group_id: int, attendance_date: date, data: AttendanceCorrection):
+    items = {item.student_id: item for item in data.attendance}
+    scope, roster = get_attendance_context(db, data.teacher_id, group_id, list(items))
+    items = {student_id: item for student_id, item in items.items() if student_id in roster}
+    if not items:
+        return {"group_id": group_id, "attendance_date": attendance_date, "changed": []}
+
+    rows = [{
+        "teacher_id": data.teacher_id,
+        "student_id": student_id,
+        "group_id": group_id,
+        "subject_id": scope.subject_id,
+        "attendance_date": attendance_date,
+        "status": item.status.value
+    } for student_id, item in items.items()]
+
+    # Rollup deltasi uchun mavjud yozuvlarning eski holati
+    existing = {
+        row.student_id: row for row in db.query(
+            Attendance.student_id, Attendance.teacher_id, Attendance.status
+        ).filter(
+            Attendance.group_id == group_id,
+            Attendance.attendance_date == attendance_date,
+            Attendance.student_id.in_(list(items))
+        ).with_for_update().all()
+    }
+
+    # Bitta upsert: yo'q yozuvlar qo'shiladi, faqat holati o'zgarganlari yangilanadi
+    stmt = pg_insert(Attendance).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=ATTENDANCE_KEY,
+        set_={"status": stmt.excluded.status, "updated_at": func.now()},
+        where=Attendance.status.is_distinct_from(stmt.excluded.status)
+    ).returning(Attendance.student_id, Attendance.status)
+    changed = db.execute(stmt).all()
+
+    added, removed = [], []
+    for row in changed:
+        old = existing.get(row.student_id)
+        teacher_id = old.teacher_id if old else data.teacher_id  # Upsert yozuv ustozini o'zgartirmaydi
+        added.append((teacher_id, row.student_id, group_id, attendance_date, row.status.value))
+        if old:
+            removed.append((old.teacher_id, row.student_id, group_id, attendance_date, old.status.value))
+    apply_attendance_delta(db, added=added, removed=removed)
+    # O'tgan sana tuzatilishi mumkin, shuning uchun streak shu studentlar uchun qayta hisoblanadi
+    rebuild_streaks(db, [(row.student_id, group_id) for row in changed])
+    db.commit()
+
+    return {
+        "group_id": group_id,
+        "attendance_date": attendance_date,
+        "changed": [{"student_id": row.student_id, "status": row.status.value} for row in changed]
+    }
+
+
+def get_recent_attendance(db: Session, *criteria, limit: int = settings.DETAIL_HISTORY_LIMIT):
+    return db.query(Attendance).filter(*criteria).order_by(
+        Attendance.attendance_date.desc(), Attendance.id.desc()
+    ).limit(limit).all()
+
+
+def get_attendance_summary(db: Session, *criteria):
+    rows = db.query(Attendance.status, func.count(Attendance.id)).filter(*criteria).group_by(Attendance.status).all()
+    summary = {status.value: count for status, count in rows}
+    summary["total"] = sum(summary.values())
+    return summary
+
+
+def attendance_filters(filters: Optional[AttendanceFilter]):
+    # Query parametrlarini SQL shartlariga aylantiradi (ix_attendance_* indekslari ishlatiladi)
+    criteria = []
+    if filters is None:
+        return criteria
+
+    if filters.group_id is not None:
+        criteria.append(Attendance.group_id == filters.group_id)
+    if filters.teacher_id is not None:
+        criteria.append(Attendance.teacher_id == filters.teacher_id)
+    if filters.student_id is not None:
+        criteria.append(Attendance.student_id == filters.student_id)
+    if filters.subject_id is not None:
+        criteria.append(Attendance.subject_id == filters.subject_id)
+    if filters.status is not None:
+        criteria.append(Attendance.status == filters.status)
+    if filters.date_from is not None:
+        criteria.append(Attendance.attendance_date >= filters.date_from)
+    if filters.date_to is not None:
+        criteria.append(Attendance.attendance_date <= filters.date_to)
+    return criteria
+
+
+def get_attendances(db: Session, limit: int = settings.PAGE_SIZE_DEFAULT, after: Optional[int] = None,
+                    filters: Optional[AttendanceFilter] = None, descending: bool = False,
+                    schema=AttendancesOutput):
+    query = db.query(Attendance).options(*projection(Attendance, schema)).filter(*attendance_filters(filters))
+    return paginate(query, Attendance, limit, after, descending)
 
 
 def get_attendance(db: Session, attendance_id: int):
@@ -475,10 +844,18 @@ def update_attendance(db: Session, attendance_id: int, data_update: AttendanceUp
         raise HTTPException(status_code=404, detail="Attendance not found !")
 
     update_data = data_update.dict(exclude_unset=True)
+    old_row = attendance_row(attendance)
+    if update_data.get("student_id", attendance.student_id) != attendance.student_id:
+        touch(db, Students, [attendance.student_id])
+    if update_data.get("teacher_id", attendance.teacher_id) != attendance.teacher_id:
+        touch(db, Teachers, [attendance.teacher_id])
 
     for key, value in update_data.items():
         setattr(attendance, key, value)
 
+    apply_attendance_delta(db, added=[attendance_row(attendance)], removed=[old_row])
+    db.flush()
+    rebuild_streaks(db, [(old_row[1], old_row[2]), (attendance.student_id, attendance.group_id)])
     db.commit()
     db.refresh(attendance)
     return attendance
@@ -486,7 +863,16 @@ def update_attendance(db: Session, attendance_id: int, data_update: AttendanceUp
 
 def delete_attendance(db: Session, attendance_id: int):
     attendance = db.query(Attendance).filter(Attendance.id == attendance_id).first()
+
+    if not attendance:
+        raise HTTPException(status_code=404, detail="Attendance not found !")
+
+    apply_attendance_delta(db, removed=[attendance_row(attendance)])
+    touch(db, Students, [attendance.student_id])
+    touch(db, Teachers, [attendance.teacher_id])
     db.delete(attendance)
+    db.flush()
+    rebuild_streaks(db, [(attendance.student_id, attendance.group_id)])
     db.commit()
     return attendance
 
@@ -497,20 +883,23 @@ def create_subject(db: Session, data: SubjectCreate):
     subject = Subjects(**data.model_dump())
     db.add(subject)
     db.commit()
+    invalidate("subjects")
     db.refresh(subject)
     return subject
 
 
-def get_subjects(db: Session):
-    return db.query(Subjects).all()
+def get_subjects(db: Session, limit: int = settings.PAGE_SIZE_DEFAULT, after: Optional[int] = None,
+                 schema=SubjectBase):
+    query = db.query(Subjects).options(*projection(Subjects, schema))
+    return serialize_page(paginate(query, Subjects, limit, after), schema)
 
 
-def get_subject_by_id(db: Session, subject_id: int):
-    return db.query(Subjects).options(
-        joinedload(Subjects.subject_group),
-        joinedload(Subjects.subject_teacher),
-        joinedload(Subjects.attendance)
+def get_subject_by_id(db: Session, subject_id: int, schema=SubjectResponse):
+    subject = db.query(Subjects).options(
+        selectinload(Subjects.subject_group),
+        selectinload(Subjects.subject_teacher)
     ).filter(Subjects.id == subject_id).first()
+    return schema.model_validate(subject, from_attributes=True) if subject else None
 
 
 def update_subject(db: Session, subject_id: int, data_update: SubjectDetail):
@@ -525,6 +914,7 @@ def update_subject(db: Session, subject_id: int, data_update: SubjectDetail):
         setattr(subject, key, value)
 
     db.commit()
+    invalidate("subjects")
     db.refresh(subject)
     return subject
 
@@ -533,6 +923,8 @@ def delete_subject(db: Session, subject_id: int):
     subject = db.query(Subjects).filter(Subjects.id == subject_id).first()
     db.delete(subject)
     db.commit()
+    # teacher_subject_id / group_subject_id NULL ga o'zgaradi, shuning uchun scope lar ham tozalanadi
+    invalidate("subjects", "scopes")
     return subject
 
 
@@ -542,14 +934,16 @@ def create_admin(db: Session, data: AdminCreate):
     admin = Admins(**data.model_dump())
     db.add(admin)
     db.commit()
+    invalidate("admins")
     db.refresh(admin)
     return admin
 
 
-def get_admins(db: Session):
-    return db.query(Admins).options(
-        joinedload(Admins.admin_account),
-    ).all()
+@cached("admins")
+def get_admins(db: Session, limit: int = settings.PAGE_SIZE_DEFAULT, after: Optional[int] = None,
+               schema=AdminOutput):
+    query = db.query(Admins).options(*projection(Admins, schema))
+    return serialize_page(paginate(query, Admins, limit, after), schema)
 
 
 def get_admin(db: Session, admin_id: int):
@@ -573,6 +967,7 @@ def update_admin(db: Session, admin_id: int, data_update: AdminUpdate):
         setattr(admin, key, value)
 
     db.commit()
+    invalidate("admins")
     db.refresh(admin)
     return admin
 
@@ -581,14 +976,16 @@ def delete_admin(db: Session, admin_id: int):
     admin = db.query(Admins).filter(Admins.id == admin_id).first()
     db.delete(admin)
     db.commit()
+    invalidate("admins")
     return admin
 
 
 # ------------------- User CRUD -----------------------
 
-def create_user(db: Session, data: UserCreate):
-    # 1. Password-ni hash qilamiz
-    hashed_password = hash_password(data.password)
+def create_user(db: Session, data: UserCreate, hashed_password: Optional[str] = None):
+    # 1. Password-ni hash qilamiz (register uni oldindan password_hasher'da hisoblab beradi)
+    if hashed_password is None:
+        hashed_password = hash_password(data.password)
 
     # 2. Data modeldan password-ni chiqarib tashlaymiz, chunki uni alohida qo'shmoqchimiz
     user_data = data.model_dump(exclude={"password"})
@@ -609,11 +1006,10 @@ def create_user(db: Session, data: UserCreate):
         "admin_id": user.admin_id
     }
 
-def get_users(db: Session):
-    return db.query(User).options(
-        joinedload(User.teacher),
-        joinedload(User.admin)
-    ).all()
+def get_users(db: Session, limit: int = settings.PAGE_SIZE_DEFAULT, after: Optional[int] = None,
+              schema=UserOutput):
+    query = db.query(User).options(*projection(User, schema))
+    return paginate(query, User, limit, after)
 
 
 def get_user(db: Session, user_id: int):
@@ -639,6 +1035,7 @@ def update_user(db: Session, user_id: int, data_update: UserUpdate):
         setattr(user, key, value)
 
     db.commit()
+    invalidate_user(user_id)
     db.refresh(user)
     return user
 
@@ -651,24 +1048,345 @@ def delete_user(db: Session, user_id: int):
 
     db.delete(user)
     db.commit()
+    invalidate_user(user_id)
     return user
 
 
-# ------------------- Save Refresh Token -----------------------
+# ------------------- Attendance Reports (rollups) -----------------------
 
-def save_refresh_token(db, user_id: int, refresh_token: str):
-    user = db.query(User).filter(User.id == user_id).first()
+def attendance_report_filters(model, filters: AttendanceReportFilter):
+    # Rollup jadvalida ustuni yo'q filtr (masalan student hisobotida group_id) e'tiborsiz qoldirilmaydi:
+    # student rollup'i guruhlar bo'yicha ajratilmagan, shuning uchun bunday filtr 400 qaytaradi
+    criteria = []
+    for key in ("group_id", "teacher_id", "student_id"):
+        value = getattr(filters, key)
+        if value is None:
+            continue
+        if not hasattr(model, key):
+            raise HTTPException(status_code=400, detail=f"Bu hisobotda {key} bo'yicha filtrlash mumkin emas")
+        criteria.append(getattr(model, key) == value)
+    if filters.date_from is not None:
+        criteria.append(model.attendance_date >= filters.date_from)
+    if filters.date_to is not None:
+        criteria.append(model.attendance_date <= filters.date_to)
+    return criteria
+
+
+def get_attendance_report(db: Session, model, key: str, filters: AttendanceReportFilter):
+    # Faqat rollup jadvali o'qiladi: oylik hisobot kunlik qatorlar soniga bog'liq, xom davomatga emas
+    key_column = getattr(model, key)
+    if filters.period == ReportPeriodEnum.month:
+        period = cast(func.date_trunc("month", model.attendance_date), Date)
+    else:
+        period = model.attendance_date
+    period = period.label("period")
+
+    rows = db.query(
+        key_column,
+        period,
+        func.sum(model.present).label("present"),
+        func.sum(model.absent).label("absent"),
+        func.sum(model.late).label("late")
+    ).filter(*attendance_report_filters(model, filters)).group_by(key_column, period).order_by(key_column, period).all()
+
+    report = []
+    for row in rows:
+        total = row.present + row.absent + row.late
+        report.append({
+            key: getattr(row, key),
+            "period": row.period,
+            "present": row.present,
+            "absent": row.absent,
+            "late": row.late,
+            "total": total,
+            "rate": round((row.present + row.late) / total, 4) if total else 0.0
+        })
+    return report
+
+
+def get_at_risk_students(db: Session, min_absences: int = settings.ABSENCE_STREAK_THRESHOLD,
+                         group_id: Optional[int] = None):
+    # Tarix emas, faqat attendance_streaks o'qiladi (ix_attendance_streaks_current_absences)
+    query = db.query(
+        AttendanceStreak.student_id,
+        Students.student_firstname,
+        Students.student_lastname,
+        Students.student_parents_fullname,
+        Students.student_parents_phone_number,
+        AttendanceStreak.group_id,
+        Groups.group_name,
+        AttendanceStreak.current_absences,
+        AttendanceStreak.last_attendance_date
+    ).join(Students, Students.id == AttendanceStreak.student_id).join(
+        Groups, Groups.id == AttendanceStreak.group_id
+    ).filter(AttendanceStreak.current_absences >= min_absences)
+
+    if group_id is not None:
+        query = query.filter(AttendanceStreak.group_id == group_id)
+
+    return query.order_by(AttendanceStreak.current_absences.desc(), AttendanceStreak.student_id).all()
+
+
+# ------------------- Search (pg_trgm) -----------------------
+
+def _folded_name(firstname, lastname):
+    # Ifoda ix_*_name_trgm indeksidagi bilan aynan bir xil bo'lishi kerak
+    return func.uz_fold(firstname.op("||")(literal_column("' '")).op("||")(lastname))
+
+
+def _digits(phone):
+    # Ifoda ix_*_phone_trgm indeksidagi bilan aynan bir xil bo'lishi kerak
+    return func.regexp_replace(phone, literal_column("'\\D'"), literal_column("''"), literal_column("'g'"))
+
+
+SEARCH_SOURCES = [
+    ("student", Students, Students.student_firstname, Students.student_lastname,
+     Students.student_phone_number, [Students.student_phone_number, Students.student_parents_phone_number]),
+    ("teacher", Teachers, Teachers.teacher_firstname, Teachers.teacher_lastname,
+     Teachers.teacher_phone_number, [Teachers.teacher_phone_number]),
+]
+
+
+def search_people(db: Session, q: str, limit: int = 20):
+    """
+    Student va ustozlarni ism-familiya (lotin yoki kirill yozuvida) yoki telefon raqami qismi bo'yicha
+    qidiradi. Shartlar pg_trgm GIN indekslariga mos keladi, natija o'xshashlik bo'yicha tartiblanadi.
+    """
+    # "Ali 90 123" kabi aralash so'rovda raqamli qismlar faqat telefon bo'yicha qidiriladi
+    term = " ".join(part for part in fold_uz(q).split() if not normalize_phone(part))
+    digits = normalize_phone(q)
+    search_name = any(char.isalpha() for char in term)
+    search_phone = len(digits) >= 3
+
+    results = []
+    for kind, model, firstname, lastname, phone_number, phones in SEARCH_SOURCES:
+        conditions = []
+        scores = []
+        if search_name:
+            name = _folded_name(firstname, lastname)
+            conditions += [literal(term).op("<%")(name), name.contains(term, autoescape=True)]
+            scores.append(func.word_similarity(literal(term), name))
+        if search_phone:
+            for phone in phones:
+                phone_digits = _digits(phone)
+                conditions.append(phone_digits.contains(digits, autoescape=True))
+                scores.append(func.similarity(phone_digits, literal(digits)) + 0.5)  # Raqam mosligi ustun turadi
+        if not conditions:
+            continue
 
+        score = (func.greatest(*scores) if len(scores) > 1 else scores[0]).label("score")
+        rows = db.query(
+            model.id, firstname.label("firstname"), lastname.label("lastname"),
+            phone_number.label("phone_number"), score
+        ).filter(or_(*conditions)).order_by(score.desc(), model.id).limit(limit).all()
+
+        results += [{"kind": kind, **row._asdict()} for row in rows]
+
+    results.sort(key=lambda row: row["score"], reverse=True)
+    return results[:limit]
+
+
+# ------------------- Versions (ETag / Last-Modified) -----------------------
+
+def get_version(db: Session, *sources) -> Version:
+    """
+    Har bir (model, shartlar) manbasi uchun max(updated_at), count va sum(id) ni bitta so'rovda
+    hisoblaydi. Natija o'zgarmagan bo'lsa, javob ham o'zgarmagan deb hisoblanadi.
+    Bog'lanish yoki ichki yozuv o'chirilganda ota yozuv touch qilinadi (app/db/touch.py), shuning uchun
+    manbalarning eng katta updated_at i Last-Modified sifatida ishlatiladi.
+    """
+    subqueries = [
+        select(
+            func.max(model.updated_at),
+            func.count(model.id),
+            func.coalesce(func.sum(model.id), 0)
+        ).where(*criteria).subquery()
+        for model, criteria in sources
+    ]
+
+    statement = select(*[column for subquery in subqueries for column in subquery.c]).select_from(subqueries[0])
+    for subquery in subqueries[1:]:
+        statement = statement.join(subquery, true())
+    row = tuple(db.execute(statement).one())
+
+    timestamps = [value for value in row[::3] if value is not None]
+    return Version(row, max(timestamps) if timestamps else None)
+
+
+def get_list_version(db: Session, model, limit: int, after: Optional[int] = None, descending: bool = False,
+                     criteria=(), related=()) -> Version:
+    """
+    Faqat so'ralgan keyset oynasi (paginate bilan bir xil shart, tartib va limit + 1) bo'yicha versiya,
+    shuning uchun narxi butun jadvalga emas, sahifa hajmiga bog'liq.
+    related: (model, fk ustun) juftlari - javobga qo'shilgan bog'liq yozuvlar (masalan to'lovdagi student
+    ismi). Ularning max(updated_at) i ham faqat oynadagi fk qiymatlari bo'yicha olinadi.
+    Oynadan qator o'chirilishi hech bir updated_at ni siljitmaydi, shuning uchun Last-Modified berilmaydi.
+    """
+    query = select(model.id, model.updated_at, *[column for _, column in related]).where(*criteria)
+    if after is not None:
+        query = query.where(model.id < after if descending else model.id > after)
+    window = query.order_by(model.id.desc() if descending else model.id).limit(limit + 1).subquery()
+
+    statement = select(
+        func.max(window.c.updated_at),
+        func.count(),
+        func.coalesce(func.sum(window.c.id), 0)
+    ).select_from(window)
+    for related_model, column in related:
+        subquery = select(func.max(related_model.updated_at)).where(
+            related_model.id.in_(select(window.c[column.key]))
+        ).subquery()
+        statement = statement.add_columns(*subquery.c).join(subquery, true())
+    return Version(tuple(db.execute(statement).one()))
+
+
+def get_student_version(db: Session, student_id: int):
+    return get_version(
+        db,
+        (Students, [Students.id == student_id]),
+        (Attendance, [Attendance.student_id == student_id]),
+        (Payments, [Payments.student_id == student_id]),
+        (Groups, [Groups.id.in_(select(student_group_association.c.groups_id)
+                                .where(student_group_association.c.students_id == student_id))]),
+        (Teachers, [Teachers.id.in_(select(teacher_students_association.c.teachers_id)
+                                    .where(teacher_students_association.c.students_id == student_id))])
+    )
+
+
+def get_teacher_version(db: Session, teacher_id: int):
+    return get_version(
+        db,
+        (Teachers, [Teachers.id == teacher_id]),
+        (Attendance, [Attendance.teacher_id == teacher_id]),
+        (Subjects, [Subjects.id.in_(select(Teachers.teacher_subject_id).where(Teachers.id == teacher_id))]),
+        (Groups, [Groups.id.in_(select(teacher_group_association.c.groups_id)
+                                .where(teacher_group_association.c.teachers_id == teacher_id))]),
+        (Students, [Students.id.in_(select(teacher_students_association.c.students_id)
+                                    .where(teacher_students_association.c.teachers_id == teacher_id))])
+    )
+
+
+def get_group_version(db: Session, group_id: int):
+    return get_version(
+        db,
+        (Groups, [Groups.id == group_id]),
+        (Subjects, [Subjects.id.in_(select(Groups.group_subject_id).where(Groups.id == group_id))]),
+        (Teachers, [Teachers.id.in_(select(teacher_group_association.c.teachers_id)
+                                    .where(teacher_group_association.c.groups_id == group_id))]),
+        (Students, [Students.id.in_(select(student_group_association.c.students_id)
+                                    .where(student_group_association.c.groups_id == group_id))])
+    )
+
+
+def get_subject_version(db: Session, subject_id: int):
+    return get_version(
+        db,
+        (Subjects, [Subjects.id == subject_id]),
+        (Teachers, [Teachers.teacher_subject_id == subject_id]),
+        (Groups, [Groups.group_subject_id == subject_id])
+    )
+
+
+def get_payment_version(db: Session, payment_id: int):
+    # PaymentDetail.student.student_groups ham javobga kiradi
+    student_id = select(Payments.student_id).where(Payments.id == payment_id)
+    return get_version(
+        db,
+        (Payments, [Payments.id == payment_id]),
+        (Students, [Students.id.in_(student_id)]),
+        (Groups, [Groups.id.in_(select(student_group_association.c.groups_id)
+                                .where(student_group_association.c.students_id.in_(student_id)))])
+    )
+
+
+def get_attendance_version(db: Session, attendance_id: int):
+    # AttendanceDetail ustoz, student, guruh va fan nomlarini ham o'z ichiga oladi
+    def referenced(model, column):
+        return model, [model.id.in_(select(column).where(Attendance.id == attendance_id))]
+
+    return get_version(
+        db,
+        (Attendance, [Attendance.id == attendance_id]),
+        referenced(Teachers, Attendance.teacher_id),
+        referenced(Students, Attendance.student_id),
+        referenced(Groups, Attendance.group_id),
+        referenced(Subjects, Attendance.subject_id)
+    )
+
+
+# ------------------- Refresh / Revoked Tokens -----------------------
+
+def save_refresh_token(db, user_id: int, refresh_token: str, expires_at: Optional[datetime] = None):
+    # Tokenning o'zi emas, sha256 hashi saqlanadi
+    if expires_at is None:
+        expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+    token = RefreshToken(user_id=user_id, token_hash=hash_token(refresh_token), expires_at=expires_at)
+    db.add(token)
+    db.commit()
+    invalidate_user(user_id)
+    logger.info(f"{user_id} id raqamiga ega foydalanuvchi uchun refresh token saqlandi")
+    return token
+
+
+def rotate_refresh_token(db: Session, refresh_token: str):
+    """
+    Refresh tokenni bekor qilib, uning egasini qaytaradi (yangi juftlik issue_tokens da yaratiladi).
+    Avval bekor qilingan token qayta kelsa, u o'g'irlangan deb hisoblanadi va
+    foydalanuvchining barcha faol refresh tokenlari bekor qilinadi.
+    """
+    now = datetime.now(timezone.utc)
+    token = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_token(refresh_token)
+    ).with_for_update().first()
+
+    if not token:
+        raise HTTPException(status_code=401, detail="Noto'g'ri refresh token")
+
+    if token.revoked_at is not None:
+        db.query(RefreshToken).filter(
+            RefreshToken.user_id == token.user_id,
+            RefreshToken.revoked_at.is_(None)
+        ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+        db.commit()
+        logger.warning(f"User id = {token.user_id}: bekor qilingan refresh token qayta ishlatildi")
+        raise HTTPException(status_code=401, detail="Refresh token bekor qilingan")
+
+    if token.expires_at <= now:
+        raise HTTPException(status_code=401, detail="Refresh token muddati tugagan")
+
+    token.revoked_at = now
+    user = db.query(User).filter(User.id == token.user_id).first()
     if not user:
-        logger.info(f"User id = {user_id} topilmadi !")
-        raise HTTPException(status_code=404, detail=f"{user_id} id raqamiga ega foydalanuvchi topilmadi !")
+        raise HTTPException(status_code=404, detail="User not found !")
+    return user
 
-    logger.info(f"{user_id} id raqamiga ega foydalanuvchi topildi, token yaratilmoqda...")
-    user.refresh_token = refresh_token
+
+def revoke_refresh_token(db: Session, refresh_token: str):
+    db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_token(refresh_token),
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.now(timezone.utc)}, synchronize_session=False)
     db.commit()
-    db.refresh(user)
-    logger.info(f"Refresh token bazaga saqlandi, refresh token: {user.refresh_token}")
-    return user
+
+
+def revoke_access_token(db: Session, jti: str, expires_at: datetime):
+    db.execute(
+        pg_insert(RevokedToken)
+        .values(jti=jti, expires_at=expires_at)
+        .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+    )
+    db.commit()
+    revoked_tokens.add(jti, expires_at)
+
+
+def load_revoked_tokens(db: Session):
+    # Startupda chaqiriladi: muddati o'tganlar o'chiriladi, qolganlari xotiraga yuklanadi
+    now = datetime.now(timezone.utc)
+    db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+    db.commit()
+    sync_revoked_tokens(db)
+    return len(revoked_tokens)
 
 
 """
@@ -0,0 +1,449 @@
+import argparse
+import csv
+import io
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice, permutations
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from pydantic import ValidationError
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.cache import invalidate
+from app.core.text import fold_uz, normalize_phone
+from app.db.ledger import apply_payment_delta
+from app.db.models import PaymentReview, Payments, Students
+from app.db.schemas import StudentCreate
+from app.db.session import offload
+
+
+"""
+CSV fayldan ommaviy import.
+
+Fayldan o'qish, parse va tekshirish (CPU-bound qism) har bir chunk uchun offload() bilan threadpool'da bajariladi,
+shuning uchun DB_ASYNC rejimida ham event loop bloklanmaydi; bazaga yozish esa sessiya bilan shu yerda qoladi.
+
+Studentlar: qatorlar bo'laklab (chunk) o'qiladi va StudentCreate bilan tekshiriladi, to'g'rilari COPY orqali
+vaqtinchalik staging jadvaliga yoziladi. Keyin students va bog'lanish jadvallariga bir nechta
+set-based so'rov bilan qo'shiladi. Noto'g'ri qatorlar xatolik ro'yxatiga tushadi, qolganlari import qilinadi.
+CSV ustunlari StudentCreate maydonlari bilan bir xil; student_groups va student_teachers - ";" bilan
+ajratilgan id lar (masalan "3;7").
+
+Bank ko'chirmasi (to'lovlar): ustunlar payment_date, payment_amount, payer_phone, payer_name, purpose.
+Barcha studentlar bir marta o'qilib xotirada telefon va ism bo'yicha indeks quriladi, har bir qator
+shu indeksdan dict orqali moslanadi. Moslangan to'lovlar bitta bulk INSERT bilan qo'shiladi,
+moslanmaganlari payment_review_queue ga tushadi.
+
+CLI:  python -m app.db.imports students students.csv
+      python -m app.db.imports payments statement.csv
+"""
+
+STAGING_COLUMNS = [
+    "line_number",
+    "student_firstname",
+    "student_lastname",
+    "student_phone_number",
+    "student_parents_fullname",
+    "student_parents_phone_number",
+    "student_additional_info",
+    "group_ids",
+    "teacher_ids",
+]
+STUDENT_COLUMNS = STAGING_COLUMNS[1:7]
+
+CREATE_STAGING = """
+    CREATE TEMPORARY TABLE student_import_staging (
+        line_number integer PRIMARY KEY,
+        student_firstname text NOT NULL,
+        student_lastname text NOT NULL,
+        student_phone_number text NOT NULL,
+        student_parents_fullname text NOT NULL,
+        student_parents_phone_number text NOT NULL,
+        student_additional_info text,
+        group_ids integer[] NOT NULL,
+        teacher_ids integer[] NOT NULL,
+        student_id integer,
+        error text
+    ) ON COMMIT DROP
+"""
+
+# Staging'dan asosiy jadvallarga: avval xatoli qatorlar belgilanadi, keyin qolganlari bitta INSERT bilan qo'shiladi
+VALIDATE_STATEMENTS = [
+    """
+    UPDATE student_import_staging SET error = 'Telefon raqami faylda takrorlangan'
+    WHERE line_number IN (
+        SELECT line_number FROM (
+            SELECT line_number,
+                   row_number() OVER (PARTITION BY student_phone_number ORDER BY line_number) AS position
+            FROM student_import_staging
+        ) numbered
+        WHERE position > 1
+    )
+    """,
+    """
+    UPDATE student_import_staging s SET error = 'Bu telefon raqamli student allaqachon mavjud'
+    FROM students st
+    WHERE st.student_phone_number = s.student_phone_number AND s.error IS NULL
+    """,
+]
+
+# {where}: bitta qator uchun "AND line_number = :line_number" (savepoint bilan qatorma-qator qo'shishda)
+INSERT_STUDENTS = f"""
+    WITH inserted AS (
+        INSERT INTO students ({", ".join(STUDENT_COLUMNS)})
+        SELECT {", ".join(STUDENT_COLUMNS)} FROM student_import_staging
+        WHERE error IS NULL {{where}}
+        ORDER BY line_number
+        ON CONFLICT (student_phone_number) DO NOTHING
+        RETURNING id, student_phone_number
+    )
+    UPDATE student_import_staging s SET student_id = inserted.id
+    FROM inserted
+    WHERE s.student_phone_number = inserted.student_phone_number AND s.error IS NULL
+"""
+
+LINK_STATEMENTS = [
+    # Parallel so'rov shu orada xuddi shu raqamni qo'shgan bo'lsa
+    """
+    UPDATE student_import_staging SET error = 'Bu telefon raqamli student allaqachon mavjud'
+    WHERE error IS NULL AND student_id IS NULL
+    """,
+    # create_student kabi mavjud bo'lmagan guruh/ustoz id lari e'tiborsiz qoldiriladi
+    """
+    INSERT INTO student_group_association (students_id, groups_id)
+    SELECT DISTINCT s.student_id, g.id
+    FROM student_import_staging s
+    CROSS JOIN LATERAL unnest(s.group_ids) AS group_id
+    JOIN groups g ON g.id = group_id
+    WHERE s.student_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO teacher_students_association (teachers_id, students_id)
+    SELECT DISTINCT t.id, s.student_id
+    FROM student_import_staging s
+    CROSS JOIN LATERAL unnest(s.teacher_ids) AS teacher_id
+    JOIN teachers t ON t.id = teacher_id
+    WHERE s.student_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+    """,
+    # Yangi studentlar bog'langan guruh va ustozlarning detail javobida ham ko'rinadi (app/db/touch.py)
+    """
+    UPDATE groups SET updated_at = now()
+    WHERE id IN (SELECT unnest(group_ids) FROM student_import_staging WHERE student_id IS NOT NULL)
+    """,
+    """
+    UPDATE teachers SET updated_at = now()
+    WHERE id IN (SELECT unnest(teacher_ids) FROM student_import_staging WHERE student_id IS NOT NULL)
+    """,
+]
+
+
+def _split_ids(value) -> List[str]:
+    return [part.strip() for part in (value or "").split(";") if part.strip()]
+
+
+def _pg_array(values: List[int]) -> str:
+    return "{" + ",".join(str(value) for value in values) + "}"
+
+
+def _column_errors(student: StudentCreate) -> List[str]:
+    # Bazada yiqiladigan, lekin pydantic o'tkazib yuboradigan qiymatlar staging'dan oldin rad etiladi
+    errors = []
+    for column in STUDENT_COLUMNS:
+        value = getattr(student, column)
+        if value is None:
+            continue
+        if "\x00" in value:
+            errors.append(f"{column}: NUL belgisi bo'lishi mumkin emas")
+        length = getattr(Students.__table__.c[column].type, "length", None)
+        if length and len(value) > length:
+            errors.append(f"{column}: ko'pi bilan {length} ta belgi bo'lishi mumkin")
+    return errors
+
+
+def _csv_line(row: list) -> str:
+    # COPY csv rejimida faqat qo'shtirnoqsiz bo'sh maydon NULL: qolgan barcha qiymatlar qo'shtirnoqqa olinadi,
+    # shuning uchun "" bo'sh satr, "\N" esa oddiy matn bo'lib qoladi
+    return ",".join(
+        "" if value is None else '"' + str(value).replace('"', '""') + '"' for value in row
+    ) + "\n"
+
+
+def _copy_rows(db: Session, rows: List[list]):
+    connection = db.connection().connection.dbapi_connection
+    cursor = connection.cursor()
+    if hasattr(cursor, "copy_expert"):  # psycopg2
+        buffer = io.StringIO()
+        buffer.writelines(
+            _csv_line([_pg_array(value) if isinstance(value, list) else value for value in row]) for row in rows
+        )
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY student_import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        return
+
+    # Async (asyncpg) rejimida COPY sync sessiyadan mavjud emas, shuning uchun executemany
+    db.execute(
+        text(f"INSERT INTO student_import_staging ({', '.join(STAGING_COLUMNS)}) "
+             f"VALUES ({', '.join(':' + column for column in STAGING_COLUMNS)})"),
+        [dict(zip(STAGING_COLUMNS, row)) for row in rows]
+    )
+
+
+def _insert_staged_students(db: Session):
+    """
+    Staging'dagi to'g'ri qatorlar bitta INSERT bilan qo'shiladi. Biror qator bazada yiqilsa (cheklov, trigger),
+    savepoint qaytariladi va qatorlar bittadan o'z savepoint'ida qo'shiladi: yiqilgan qator xatosi
+    staging'ga yoziladi, butun import bekor bo'lmaydi.
+    """
+    try:
+        with db.begin_nested():
+            db.execute(text(INSERT_STUDENTS.format(where="")))
+        return
+    except (DataError, IntegrityError):
+        pass
+
+    line_numbers = db.execute(text(
+        "SELECT line_number FROM student_import_staging WHERE error IS NULL ORDER BY line_number"
+    )).scalars().all()
+    for line_number in line_numbers:
+        try:
+            with db.begin_nested():
+                db.execute(text(INSERT_STUDENTS.format(where="AND line_number = :line_number")),
+                           {"line_number": line_number})
+        except (DataError, IntegrityError) as e:
+            db.execute(text("UPDATE student_import_staging SET error = :error WHERE line_number = :line_number"),
+                       {"error": str(e.orig).splitlines()[0], "line_number": line_number})
+
+
+def _parse_students(reader: Iterator, chunk_size: int):
+    # Keyingi chunk: (o'qilgan qatorlar soni, staging qatorlari, xatolar). Sessiyaga tegmaydi (offload)
+    chunk = list(islice(reader, chunk_size))
+    staged = []
+    errors = []
+    for line_number, row in chunk:
+        try:
+            student = StudentCreate.model_validate({
+                **row,
+                "student_groups": _split_ids(row.get("student_groups")),
+                "student_teachers": _split_ids(row.get("student_teachers")),
+            })
+        except ValidationError as e:
+            errors.append({
+                "row": line_number,
+                "errors": [f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()]
+            })
+            continue
+
+        column_errors = _column_errors(student)
+        if column_errors:
+            errors.append({"row": line_number, "errors": column_errors})
+            continue
+
+        staged.append([
+            line_number,
+            *(getattr(student, column) for column in STUDENT_COLUMNS),
+            student.student_groups or [],
+            student.student_teachers or [],
+        ])
+    return len(chunk), staged, errors
+
+
+def import_students(db: Session, lines: Iterable[str], chunk_size: int = 1000) -> dict:
+    db.execute(text(CREATE_STAGING))
+
+    total = 0
+    errors = []
+    reader = enumerate(csv.DictReader(lines), start=2)  # 1-qator - sarlavha
+    while True:
+        count, staged, chunk_errors = offload(_parse_students, reader, chunk_size)
+        if not count:
+            break
+        total += count
+        errors += chunk_errors
+        if staged:
+            _copy_rows(db, staged)
+
+    for statement in VALIDATE_STATEMENTS:
+        db.execute(text(statement))
+    _insert_staged_students(db)
+    for statement in LINK_STATEMENTS:
+        db.execute(text(statement))
+
+    inserted = db.execute(text("SELECT count(*) FROM student_import_staging WHERE student_id IS NOT NULL")).scalar()
+    errors += [
+        {"row": row.line_number, "errors": [row.error]}
+        for row in db.execute(text("SELECT line_number, error FROM student_import_staging WHERE error IS NOT NULL"))
+    ]
+    db.commit()
+    invalidate("scopes")
+
+    errors.sort(key=lambda error: error["row"])
+    return {"total": total, "inserted": inserted, "errors": errors}
+
+
+# ------------------- Bank ko'chirmasi -----------------------
+
+PHONE_KEY_LENGTH = 9  # "+998 90 123 45 67" va "90 123 45 67" bir xil kalitga tushishi uchun oxirgi 9 raqam
+DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y")
+
+
+def _phone_key(value: Optional[str]) -> Optional[str]:
+    digits = normalize_phone(value or "")
+    return digits[-PHONE_KEY_LENGTH:] if len(digits) >= PHONE_KEY_LENGTH else None
+
+
+def _parse_date(value: str) -> date:
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"payment_date: noma'lum sana formati '{value}'")
+
+
+def _parse_amount(value: str) -> Decimal:
+    # "1 200 000,50" -> Decimal("1200000.50")
+    cleaned = (value or "").replace("\xa0", "").replace(" ", "").replace(",", ".")
+    try:
+        amount = Decimal(cleaned).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError(f"payment_amount: summa noto'g'ri '{value}'")
+    if amount <= 0:
+        raise ValueError("payment_amount: summa musbat bo'lishi kerak")
+    return amount
+
+
+class StudentIndex:
+    """
+    Studentlarni moslash uchun xotiradagi indeks: telefon kaliti (student va ota-ona raqami) -> id lar,
+    (ism, familiya) fold_uz ko'rinishida -> id lar. Har bir ko'chirma qatori bir necha dict murojaati bilan moslanadi.
+    """
+
+    def __init__(self, rows):
+        self.phones: Dict[str, Set[int]] = defaultdict(set)
+        self.names: Dict[tuple, Set[int]] = defaultdict(set)
+        for student_id, firstname, lastname, phone, parents_phone in rows:
+            for key in (_phone_key(phone), _phone_key(parents_phone)):
+                if key:
+                    self.phones[key].add(student_id)
+            self.names[(fold_uz(firstname).strip(), fold_uz(lastname).strip())].add(student_id)
+
+    @classmethod
+    def load(cls, db: Session) -> "StudentIndex":
+        rows = db.query(
+            Students.id,
+            Students.student_firstname,
+            Students.student_lastname,
+            Students.student_phone_number,
+            Students.student_parents_phone_number
+        ).all()
+        return offload(cls, rows)  # Indeks qurish (fold_uz, telefon kalitlari) - CPU-bound
+
+    def by_name(self, name: Optional[str]) -> Set[int]:
+        # "Karimov Anvar Olimovich" -> ism/familiya har qanday tartibda
+        tokens = fold_uz(name or "").split()
+        found = set()
+        for pair in permutations(tokens, 2):
+            found |= self.names.get(pair, set())
+        return found
+
+    def match(self, phone: Optional[str], name: Optional[str]) -> Set[int]:
+        by_phone = self.phones.get(_phone_key(phone), set())
+        by_name = self.by_name(name)
+        if by_phone:
+            # Bitta raqam bir necha studentga tegishli bo'lsa (aka-uka, bitta ota-ona) ism bo'yicha toraytiriladi
+            return (by_phone & by_name) or by_phone
+        return by_name
+
+
+def _parse_payments(reader: Iterator, chunk_size: int, index: StudentIndex):
+    # Keyingi chunk: (o'qilgan qatorlar soni, moslangan to'lovlar, review qatorlari, xatolar). Sessiyaga tegmaydi
+    chunk = list(islice(reader, chunk_size))
+    payments = []
+    reviews = []
+    errors = []
+    for line_number, row in chunk:
+        try:
+            payment_date = _parse_date(row.get("payment_date") or "")
+            payment_amount = _parse_amount(row.get("payment_amount"))
+        except ValueError as e:
+            errors.append({"row": line_number, "errors": [str(e)]})
+            continue
+
+        candidates = index.match(row.get("payer_phone"), row.get("payer_name"))
+        if len(candidates) == 1:
+            payments.append({
+                "student_id": next(iter(candidates)),
+                "payment_date": payment_date,
+                "payment_amount": payment_amount
+            })
+            continue
+
+        reviews.append({
+            "payment_date": payment_date,
+            "payment_amount": payment_amount,
+            "payer_name": row.get("payer_name") or None,
+            "payer_phone": row.get("payer_phone") or None,
+            "purpose": row.get("purpose") or None,
+            "reason": "Bir nechta student mos keldi" if candidates else "Student topilmadi",
+            "candidate_ids": sorted(candidates) or None
+        })
+    return len(chunk), payments, reviews, errors
+
+
+def import_payments(db: Session, lines: Iterable[str], chunk_size: int = 1000) -> dict:
+    index = StudentIndex.load(db)
+
+    total = inserted = queued = 0
+    errors = []
+    reader = enumerate(csv.DictReader(lines), start=2)  # 1-qator - sarlavha
+    while True:
+        count, payments, reviews, chunk_errors = offload(_parse_payments, reader, chunk_size, index)
+        if not count:
+            break
+        total += count
+        errors += chunk_errors
+
+        if payments:
+            db.execute(insert(Payments), payments)
+            apply_payment_delta(db, added=[
+                (payment["student_id"], payment["payment_date"], payment["payment_amount"]) for payment in payments
+            ])
+            inserted += len(payments)
+        if reviews:
+            db.execute(insert(PaymentReview), reviews)
+            queued += len(reviews)
+
+    db.commit()
+    return {"total": total, "inserted": inserted, "queued": queued, "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV fayldan ommaviy import")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command in ("students", "payments"):
+        command_parser = subparsers.add_parser(command)
+        command_parser.add_argument("path")
+        command_parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+
+    importer = import_students if args.command == "students" else import_payments
+    with SessionLocal() as db, open(args.path, encoding="utf-8-sig", newline="") as file:
+        result = importer(db, file, args.chunk_size)
+
+    queued = f", ko'rib chiqishga: {result['queued']}" if "queued" in result else ""
+    print(f"Jami: {result['total']}, qo'shildi: {result['inserted']}{queued}, xato: {len(result['errors'])}")
+    for error in result["errors"]:
+        print(f"  {error['row']}-qator: {'; '.join(error['errors'])}")
+
+
+if __name__ == "__main__":
+    main()
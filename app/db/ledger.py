@@ -0,0 +1,100 @@
+import argparse
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import cast, delete, func, insert, select, Date
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models import Payments, PaymentMonthly, PaymentStudentTotal
+
+
+"""
+To'lovlar ledger'i: oy bo'yicha tushum (payment_monthly) va student bo'yicha jami to'lov
+(payment_student_totals) jadvallari. crud.py dagi to'lov yozuvchi funksiyalar shu tranzaksiya ichida
+apply_payment_delta ni chaqiradi, summary endpointlar esa faqat shu jadvallarni o'qiydi.
+Summalar Numeric/Decimal, shuning uchun yig'indida yaxlitlash xatosi to'planmaydi.
+
+Backfill yoki tuzatish uchun:  python -m app.db.ledger rebuild
+"""
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def payment_row(payment: Payments) -> tuple:
+    # Delta uchun to'lovning ledger'ga tegishli qismi: (student_id, payment_date, payment_amount)
+    return payment.student_id, payment.payment_date, Decimal(str(payment.payment_amount))
+
+
+def _upsert(db: Session, table, key: str, deltas: dict):
+    rows = [
+        {key: key_value, "total_amount": amount, "payments_count": count}
+        for key_value, (amount, count) in deltas.items()
+        if amount or count
+    ]
+    if not rows:
+        return
+
+    stmt = pg_insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={
+            "total_amount": table.total_amount + stmt.excluded.total_amount,
+            "payments_count": table.payments_count + stmt.excluded.payments_count
+        }
+    )
+    db.execute(stmt)
+
+
+def apply_payment_delta(db: Session, added: Iterable[tuple] = (), removed: Iterable[tuple] = ()):
+    # added/removed - payment_row() qatorlari. Commit chaqiruvchi tomonidan qilinadi
+    monthly = defaultdict(lambda: [Decimal("0"), 0])
+    students = defaultdict(lambda: [Decimal("0"), 0])
+
+    for rows, sign in ((added, 1), (removed, -1)):
+        for student_id, payment_date, amount in rows:
+            for deltas, key in ((monthly, month_start(payment_date)), (students, student_id)):
+                deltas[key][0] += sign * amount
+                deltas[key][1] += sign
+
+    _upsert(db, PaymentMonthly, "month", monthly)
+    _upsert(db, PaymentStudentTotal, "student_id", students)
+
+
+def rebuild(db: Session):
+    # Ikkala ledger jadvalini payments jadvalidan qaytadan hisoblaydi (set-based)
+    db.execute(delete(PaymentMonthly))
+    db.execute(delete(PaymentStudentTotal))
+
+    month = cast(func.date_trunc("month", Payments.payment_date), Date)
+    db.execute(insert(PaymentMonthly).from_select(
+        ["month", "total_amount", "payments_count"],
+        select(month, func.sum(Payments.payment_amount), func.count(Payments.id)).group_by(month)
+    ))
+    db.execute(insert(PaymentStudentTotal).from_select(
+        ["student_id", "total_amount", "payments_count"],
+        select(Payments.student_id, func.sum(Payments.payment_amount), func.count(Payments.id))
+        .group_by(Payments.student_id)
+    ))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="To'lovlar ledger jadvallarini qayta hisoblash")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild")
+    parser.parse_args()
+
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        rebuild(db)
+    print("To'lovlar ledger'i qayta hisoblandi")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+from functools import lru_cache
+from typing import get_args
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+
+"""
+Response model (pydantic sxema) asosida SQLAlchemy loader options yaratadi.
+Sxemada bor ustunlar load_only bilan, bog'lanishlar esa alohida selectin (to'plamlar uchun)
+yoki joined (many-to-one uchun) so'rov bilan yuklanadi. Sxemada yo'q ustun va bog'lanishlar
+umuman o'qilmaydi, shuning uchun ro'yxat endpointlari keraksiz qatorlarni tortib kelmaydi.
+"""
+
+
+def _nested_schema(annotation):
+    # Optional[List[GroupOutput]] kabi annotatsiya ichidan pydantic modelni topadi
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+
+    for arg in get_args(annotation):
+        schema = _nested_schema(arg)
+        if schema is not None:
+            return schema
+    return None
+
+
+@lru_cache(maxsize=None)
+def projection(model, schema) -> tuple:
+    mapper = inspect(model)
+    columns = []
+    relations = []
+
+    for name, field in schema.model_fields.items():
+        if name in mapper.column_attrs:
+            columns.append(getattr(model, name))
+            continue
+
+        if name not in mapper.relationships:
+            continue  # Sxemadagi hisoblanadigan maydonlar (bazada ustuni yo'q)
+
+        relationship = mapper.relationships[name]
+        attribute = getattr(model, name)
+
+        if relationship.uselist:
+            loader = selectinload(attribute)
+        else:
+            loader = joinedload(attribute)
+            # many-to-one bog'lanishni yuklash uchun foreign key ustuni ham kerak
+            for column in relationship.local_columns:
+                columns.append(getattr(model, mapper.get_property_by_column(column).key))
+
+        nested = _nested_schema(field.annotation)
+        if nested is not None:
+            loader = loader.options(*projection(relationship.mapper.class_, nested))
+        relations.append(loader)
+
+    if not columns:
+        columns = [getattr(model, mapper.get_property_by_column(column).key) for column in mapper.primary_key]
+
+    return (load_only(*columns), *relations)
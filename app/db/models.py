@@ -3,13 +3,14 @@ from sqlalchemy import (Column,
                         String,
                         ForeignKey,
                         Text,
-                        Float,
+                        Numeric,
                         Boolean,
                         Table,
                         Date,
                         DateTime,
                         func,
                         Enum,
+                        Index,
                         CheckConstraint)
 from sqlalchemy.dialects.postgresql import ENUM, ARRAY
 from sqlalchemy.orm import relationship
@@ -116,12 +117,51 @@ class Payments(Base):
     student = relationship("Students", back_populates="student_payment", passive_deletes=True)
 
     payment_date = Column(Date, nullable=False)
-    payment_amount = Column(Float, nullable=False)
+    payment_amount = Column(Numeric(12, 2), nullable=False)  # Aniq summa (Float yaxlitlash xatosiz)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())  # Avtomatik kiritish vaqtini saqlash
     updated_at = Column(DateTime(timezone=True), server_default=func.now(),
                         onupdate=func.now())  # Yangilangan vaqtini avtomatik saqlash
 
+    __table_args__ = (
+        Index("ix_payments_student_id_payment_date", "student_id", "payment_date"),
+        Index("ix_payments_payment_date", "payment_date"),
+    )
+
+
+
+class PaymentMonthly(Base):
+    # To'lovlar ledger'i: oy bo'yicha tushum (app/db/ledger.py yangilaydi)
+    __tablename__ = "payment_monthly"
+
+    month = Column(Date, primary_key=True)  # Oyning birinchi kuni
+    total_amount = Column(Numeric(14, 2), nullable=False, server_default="0")
+    payments_count = Column(Integer, nullable=False, server_default="0")
+
+
+class PaymentStudentTotal(Base):
+    # To'lovlar ledger'i: student bo'yicha jami to'langan summa
+    __tablename__ = "payment_student_totals"
+
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    total_amount = Column(Numeric(14, 2), nullable=False, server_default="0")
+    payments_count = Column(Integer, nullable=False, server_default="0")
+
+
+class PaymentReview(Base):
+    # Bank ko'chirmasidan studentga moslanmagan to'lovlar (qo'lda ko'rib chiqish navbati, app/db/imports.py)
+    __tablename__ = "payment_review_queue"
+
+    id = Column(Integer, primary_key=True)
+    payment_date = Column(Date, nullable=False)
+    payment_amount = Column(Numeric(12, 2), nullable=False)
+    payer_name = Column(String, nullable=True)
+    payer_phone = Column(String, nullable=True)
+    purpose = Column(String, nullable=True)
+    reason = Column(String, nullable=False)
+    candidate_ids = Column(ARRAY(Integer), nullable=True)  # Bir nechta student mos kelganda
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Attendance(Base):
     __tablename__ = "attendance"
@@ -151,6 +191,59 @@ class Attendance(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(),
                         onupdate=func.now())  # Yangilangan vaqtini avtomatik saqlash
 
+    __table_args__ = (
+        Index("ix_attendance_group_id_attendance_date", "group_id", "attendance_date"),
+        Index("ix_attendance_student_id_attendance_date", "student_id", "attendance_date"),
+        Index("ix_attendance_teacher_id_attendance_date", "teacher_id", "attendance_date"),
+        Index("uq_attendance_student_group_date", "student_id", "group_id", "attendance_date", unique=True),
+    )
+
+
+
+class AttendanceGroupDaily(Base):
+    # Davomat rollup'i: guruh + ustoz + kun bo'yicha holatlar soni (app/db/rollups.py yangilaydi)
+    __tablename__ = "attendance_group_daily"
+
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+    teacher_id = Column(Integer, ForeignKey("teachers.id", ondelete="CASCADE"), primary_key=True)
+    attendance_date = Column(Date, primary_key=True)
+    present = Column(Integer, nullable=False, server_default="0")
+    absent = Column(Integer, nullable=False, server_default="0")
+    late = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        Index("ix_attendance_group_daily_teacher_id_attendance_date", "teacher_id", "attendance_date"),
+        Index("ix_attendance_group_daily_attendance_date", "attendance_date"),
+    )
+
+
+class AttendanceStudentDaily(Base):
+    # Davomat rollup'i: student + kun bo'yicha holatlar soni
+    __tablename__ = "attendance_student_daily"
+
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    attendance_date = Column(Date, primary_key=True)
+    present = Column(Integer, nullable=False, server_default="0")
+    absent = Column(Integer, nullable=False, server_default="0")
+    late = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        Index("ix_attendance_student_daily_attendance_date", "attendance_date"),
+    )
+
+
+class AttendanceStreak(Base):
+    # (student, group) bo'yicha ketma-ket oxirgi qoldirilgan darslar soni (app/db/analytics.py yangilaydi)
+    __tablename__ = "attendance_streaks"
+
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+    current_absences = Column(Integer, nullable=False, server_default="0")
+    last_attendance_date = Column(Date, nullable=False)
+
+    __table_args__ = (
+        Index("ix_attendance_streaks_current_absences", "current_absences"),
+    )
 
 class Subjects(Base):
     __tablename__ = "subjects"
@@ -206,3 +299,23 @@ class User(Base):
             name="user_has_role"
         ),
     )
+
+
+class RefreshToken(Base):
+    # Refresh tokenning o'zi emas, faqat sha256 hashi saqlanadi
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)  # Rotatsiya yoki logout vaqti
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RevokedToken(Base):
+    # Muddati tugamagan, lekin bekor qilingan access tokenlar (jti). Worker lar davriy ravishda xotiraga oladi
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,143 @@
+import argparse
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models import Attendance, AttendanceGroupDaily, AttendanceStudentDaily
+from app.enums import AttendanceEnum
+
+
+"""
+Davomat rollup jadvallari (attendance_group_daily, attendance_student_daily).
+crud.py dagi davomat yozuvchi funksiyalar o'zgargan qatorlar uchun delta hisoblab, shu tranzaksiya
+ichida bitta upsert bilan rollup'larni yangilaydi. Hisobotlar xom attendance jadvalini emas,
+faqat rollup'larni o'qiydi.
+
+Backfill yoki tuzatish uchun:  python -m app.db.rollups rebuild [--date-from YYYY-MM-DD] [--date-to YYYY-MM-DD]
+"""
+
+STATUSES = [status.value for status in AttendanceEnum]
+
+
+def attendance_row(attendance: Attendance) -> tuple:
+    # Delta uchun davomat yozuvining rollup'ga tegishli qismi
+    status = attendance.status.value if isinstance(attendance.status, AttendanceEnum) else attendance.status
+    return attendance.teacher_id, attendance.student_id, attendance.group_id, attendance.attendance_date, status
+
+
+def _upsert(db: Session, table, keys: list, deltas: dict):
+    rows = [
+        {**dict(zip(keys, key)), **counts}
+        for key, counts in deltas.items()
+        if any(counts.values())
+    ]
+    if not rows:
+        return
+
+    stmt = pg_insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={status: getattr(table, status) + getattr(stmt.excluded, status) for status in STATUSES}
+    )
+    db.execute(stmt)
+
+
+def apply_attendance_delta(db: Session, added: Iterable[tuple] = (), removed: Iterable[tuple] = ()):
+    """
+    added/removed - attendance_row() ko'rinishidagi (teacher_id, student_id, group_id, date, status) qatorlar.
+    Commit chaqiruvchi tomonidan qilinadi, shuning uchun rollup xom jadval bilan birga yoziladi.
+    """
+    group_deltas = defaultdict(lambda: dict.fromkeys(STATUSES, 0))
+    student_deltas = defaultdict(lambda: dict.fromkeys(STATUSES, 0))
+
+    for rows, sign in ((added, 1), (removed, -1)):
+        for teacher_id, student_id, group_id, attendance_date, status in rows:
+            if attendance_date is None:
+                continue
+            if group_id is not None and teacher_id is not None:
+                group_deltas[(group_id, teacher_id, attendance_date)][status] += sign
+            if student_id is not None:
+                student_deltas[(student_id, attendance_date)][status] += sign
+
+    _upsert(db, AttendanceGroupDaily, ["group_id", "teacher_id", "attendance_date"], group_deltas)
+    _upsert(db, AttendanceStudentDaily, ["student_id", "attendance_date"], student_deltas)
+
+
+def _status_counts():
+    return [func.count().filter(Attendance.status == status).label(status) for status in STATUSES]
+
+
+def subtract_attendance(db: Session, *criteria):
+    """
+    Shartga mos davomat yozuvlarini rollup'lardan set-based ayiradi. Student yoki guruh o'chirilganda
+    attendance qatorlari ON DELETE CASCADE bilan o'chadi va crud.py ga qaytmaydi, shuning uchun
+    o'chirishdan oldin chaqiriladi. Commit chaqiruvchi tomonidan qilinadi.
+    """
+    for table, keys in ((AttendanceGroupDaily, ["group_id", "teacher_id", "attendance_date"]),
+                        (AttendanceStudentDaily, ["student_id", "attendance_date"])):
+        key_columns = [getattr(Attendance, key) for key in keys]
+        counts = select(*key_columns, *_status_counts()).where(
+            *[column.is_not(None) for column in key_columns], *criteria
+        ).group_by(*key_columns).subquery()
+
+        db.execute(
+            update(table)
+            .where(*[getattr(table, key) == counts.c[key] for key in keys])
+            .values({status: getattr(table, status) - counts.c[status] for status in STATUSES})
+        )
+
+
+def _date_criteria(column, date_from: Optional[date], date_to: Optional[date]):
+    criteria = []
+    if date_from is not None:
+        criteria.append(column >= date_from)
+    if date_to is not None:
+        criteria.append(column <= date_to)
+    return criteria
+
+
+def rebuild(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    # Berilgan oraliqdagi rollup qatorlarini attendance jadvalidan qaytadan hisoblaydi (set-based)
+    db.execute(delete(AttendanceGroupDaily).where(
+        *_date_criteria(AttendanceGroupDaily.attendance_date, date_from, date_to)))
+    db.execute(delete(AttendanceStudentDaily).where(
+        *_date_criteria(AttendanceStudentDaily.attendance_date, date_from, date_to)))
+
+    attendance_criteria = _date_criteria(Attendance.attendance_date, date_from, date_to)
+    db.execute(insert(AttendanceGroupDaily).from_select(
+        ["group_id", "teacher_id", "attendance_date", *STATUSES],
+        select(Attendance.group_id, Attendance.teacher_id, Attendance.attendance_date, *_status_counts())
+        .where(Attendance.group_id.is_not(None), Attendance.teacher_id.is_not(None),
+               Attendance.attendance_date.is_not(None), *attendance_criteria)
+        .group_by(Attendance.group_id, Attendance.teacher_id, Attendance.attendance_date)
+    ))
+    db.execute(insert(AttendanceStudentDaily).from_select(
+        ["student_id", "attendance_date", *STATUSES],
+        select(Attendance.student_id, Attendance.attendance_date, *_status_counts())
+        .where(Attendance.student_id.is_not(None), Attendance.attendance_date.is_not(None), *attendance_criteria)
+        .group_by(Attendance.student_id, Attendance.attendance_date)
+    ))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Davomat rollup jadvallarini qayta hisoblash")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild")
+    rebuild_parser.add_argument("--date-from", type=date.fromisoformat)
+    rebuild_parser.add_argument("--date-to", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        rebuild(db, args.date_from, args.date_to)
+    print("Davomat rollup'lari qayta hisoblandi")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 from __future__ import annotations
-from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Generic, List, Optional, TypeVar
 from datetime import datetime, date
-from app.enums import AttendanceEnum, RoleEnum
+from decimal import Decimal
+from app.enums import AttendanceEnum, BatchModeEnum, ReportPeriodEnum, RoleEnum
 
 
 # Modellar va ForwardRef (agar kerak bo'lsa)
@@ -10,6 +11,14 @@ class _Config:
     model_config = dict(from_attributes=True)
 
 
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):  # Ro'yxat endpointlari uchun (keyset pagination)
+    items: List[T]
+    next_cursor: Optional[int] = None
+
+
 # Teacher model
 class TeacherBase(BaseModel, _Config):
     id: int
@@ -46,6 +55,17 @@ class TeacherOutput(BaseModel):  # crud.py get_teachers funksiyasi uchun
         from_attributes = True
 
 
+class TeacherRecord(BaseModel, _Config):  # Yaratish/yangilash/o'chirish javobi (jadval ustunlari)
+    id: int
+    teacher_firstname: str
+    teacher_lastname: str
+    teacher_phone_number: str
+    teacher_email: Optional[str] = None
+    teacher_subject_id: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+
+
 class TeacherCreate(BaseModel):
     teacher_firstname: str
     teacher_lastname: str
@@ -66,11 +86,16 @@ class TeacherUpdate(BaseModel):
     teacher_students: Optional[List[int]] = []
 
 
+class TeacherBatchUpdate(TeacherUpdate):  # PUT /teachers/batch
+    id: int
+
+
 class TeacherDetail(TeacherBase):
     teacher_subject: Optional["SubjectBase"]  # ForwardRef ishlatish
     teacher_groups: Optional[List["GroupOutput"]] = []  # ForwardRef ishlatish
     teacher_students: Optional[List["StudentGroupInfo"]] = []  # ForwardRef ishlatish
-    attendance: Optional[List["AttendanceBase"]] = []  # ForwardRef ishlatish
+    attendance: Optional[List["AttendanceBase"]] = []  # Oxirgi DETAIL_HISTORY_LIMIT ta yozuv
+    attendance_summary: Optional["AttendanceSummary"] = None
 
 
 class TeacherUnassignRequest(BaseModel):
@@ -87,11 +112,21 @@ class SubjectCreate(BaseModel):
     subject_name: str
 
 
+class SubjectBatchUpdate(BaseModel):  # PUT /subjects/batch
+    id: int
+    subject_name: Optional[str] = None
+
+
 class SubjectOutput(BaseModel):
     id: int
     subject_name: str
 
 
+class SubjectRecord(SubjectBase):  # Yaratish/yangilash/o'chirish javobi
+    created_at: datetime
+    updated_at: datetime
+
+
 class SubjectResponse(SubjectBase):
     subject_teacher: List[TeacherSubject] = []
     subject_group: List[GroupSubject]
@@ -135,6 +170,18 @@ class StudentPaymentInfo(BaseModel):
         model_config = ConfigDict(from_attributes=True)
 
 
+class StudentRecord(BaseModel, _Config):  # Yaratish/yangilash/o'chirish javobi (jadval ustunlari)
+    id: int
+    student_firstname: str
+    student_lastname: str
+    student_phone_number: str
+    student_parents_fullname: str
+    student_parents_phone_number: str
+    student_additional_info: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
 class StudentCreate(BaseModel, _Config):
     student_firstname: str
     student_lastname: str
@@ -159,9 +206,46 @@ class StudentUpdate(BaseModel):
 
 class StudentDetail(StudentBase):
     student_groups: List["GroupOutput"] = []  # ForwardRef ishlatish
-    student_attendance: List["AttendanceBase"] = []  # ForwardRef ishlatish
-    student_payment: List["PaymentBase"] = []  # ForwardRef ishlatish
+    student_attendance: List["AttendanceBase"] = []  # Oxirgi DETAIL_HISTORY_LIMIT ta yozuv
+    student_payment: List["PaymentBase"] = []  # Oxirgi DETAIL_HISTORY_LIMIT ta yozuv
     student_teachers: List[TeacherOutput] = []
+    attendance_summary: Optional["AttendanceSummary"] = None
+    payment_summary: Optional["PaymentSummary"] = None
+
+
+class MembershipIds(BaseModel):  # Bir nechta guruh/ustoz/studentni bittada bog'lash
+    ids: List[int] = Field(min_length=1)
+
+
+class MembershipChange(BaseModel):
+    owner_id: int
+    changed: List[int]  # Haqiqatan bog'langan (yoki uzilgan) id lar
+    unchanged: List[int]  # Allaqachon shu holatda bo'lgan yoki mavjud bo'lmagan id lar
+
+
+class BatchItemResult(BaseModel):  # index - so'rovdagi elementning tartib raqami
+    index: int
+    id: Optional[int] = None
+    ok: bool
+    errors: List[str] = []
+
+
+class BatchResult(BaseModel):
+    mode: BatchModeEnum
+    succeeded: int
+    failed: int
+    items: List[BatchItemResult]
+
+
+class ImportRowError(BaseModel):  # CSV importda o'tkazib yuborilgan qator (row - fayldagi qator raqami)
+    row: int
+    errors: List[str]
+
+
+class StudentImportResult(BaseModel):  # POST /students/import
+    total: int
+    inserted: int
+    errors: List[ImportRowError]
 
 
 class StudentGroupInfo(BaseModel):  # GroupDetail uchun crud.py get_students uchun ham
@@ -201,6 +285,11 @@ class GroupOutput(BaseModel):  # crud.py get_teacher funksiyasi uchun
         from_attributes = True
 
 
+class GroupRecord(GroupBase):  # Yaratish/yangilash/o'chirish javobi
+    created_at: datetime
+    updated_at: datetime
+
+
 class GroupCreate(BaseModel):
     group_name: str
     lesson_time: str
@@ -215,6 +304,10 @@ class GroupUpdate(BaseModel):
     group_subject_id: Optional[int] = None
 
 
+class GroupBatchUpdate(GroupUpdate):  # PUT /groups/batch
+    id: int
+
+
 class GroupDetail(GroupBase):
     group_subject: Optional[SubjectBase] = None
     group_teachers: List[TeacherGroupInfo]
@@ -236,32 +329,118 @@ class GroupSubject(BaseModel):  # crud.py: get_subjects funksiyasi uchun
 class PaymentBase(BaseModel, _Config):
     id: int
     payment_date: date
-    payment_amount: float
+    payment_amount: Decimal
 
 
 class PaymentCreate(BaseModel):
     student_id: int
     payment_date: date
-    payment_amount: float
+    payment_amount: Decimal = Field(max_digits=12, decimal_places=2)
 
 
 class PaymentsOutput(BaseModel):
     id: int
     student: StudentGroupInfo
     payment_date: date
-    payment_amount: float
+    payment_amount: Decimal
+
+
+class PaymentRecord(PaymentBase):  # Yaratish/yangilash/o'chirish javobi
+    student_id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class PaymentSummary(BaseModel):  # StudentDetail uchun to'lovlar bo'yicha umumiy hisob
+    count: int = 0
+    total_amount: Decimal = Decimal(0)
+    last_payment_date: Optional[date] = None
+
+
+class PaymentFilter(BaseModel):  # crud.py get_payments uchun query parametrlar
+    student_id: Optional[int] = None
+    group_id: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    amount_min: Optional[Decimal] = None
+    amount_max: Optional[Decimal] = None
 
 
 class PaymentUpdate(PaymentBase):
     payment_date: Optional[date]
-    payment_amount: Optional[float]
+    payment_amount: Optional[Decimal] = Field(max_digits=12, decimal_places=2)
+
+
+class PaymentReviewItem(BaseModel):  # Bank ko'chirmasidan moslanmagan qator
+    id: int
+    payment_date: date
+    payment_amount: Decimal
+    payer_name: Optional[str] = None
+    payer_phone: Optional[str] = None
+    purpose: Optional[str] = None
+    reason: str
+    candidate_ids: Optional[List[int]] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class PaymentReviewResolve(BaseModel):
+    student_id: int
+
+
+class PaymentImportResult(BaseModel):  # POST /payments/import
+    total: int
+    inserted: int
+    queued: int
+    errors: List[ImportRowError]
+
+
+class Debtor(BaseModel):  # Hisob davrida to'lov qilmagan student
+    id: int
+    student_firstname: str
+    student_lastname: str
+    student_phone_number: str
+    student_parents_fullname: str
+    student_parents_phone_number: str
+
+    class Config:
+        from_attributes = True
+
+
+class SearchResult(BaseModel):  # /search: student yoki ustoz, o'xshashlik bo'yicha tartiblangan
+    kind: str  # "student" yoki "teacher"
+    id: int
+    firstname: str
+    lastname: str
+    phone_number: str
+    score: float
+
+
+class RevenueMonth(BaseModel):  # payment_monthly ledger jadvalidan
+    month: date
+    total_amount: Decimal
+    payments_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class StudentPaidTotal(BaseModel):  # payment_student_totals ledger jadvalidan
+    student_id: int
+    total_amount: Decimal
+    payments_count: int
+
+    class Config:
+        from_attributes = True
 
 
 class PaymentDetail(PaymentBase):
     id: int
     student: StudentPaymentInfo
     payment_date: date
-    payment_amount: float
+    payment_amount: Decimal
     created_at: datetime
     updated_at: datetime
 
@@ -273,6 +452,15 @@ class AttendanceBase(BaseModel, _Config):
     status: AttendanceEnum
 
 
+class AttendanceRecord(AttendanceBase):  # Yangilash/o'chirish javobi
+    teacher_id: Optional[int] = None
+    student_id: Optional[int] = None
+    group_id: Optional[int] = None
+    subject_id: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+
+
 class AttendanceInputItem(BaseModel):
     student_id: int
     status: AttendanceEnum = AttendanceEnum.absent
@@ -284,6 +472,11 @@ class AttendanceCreate(BaseModel):
     attendance: List[AttendanceInputItem]
 
 
+class AttendanceCorrection(BaseModel):  # Guruhning bir kunlik davomatini tuzatish uchun
+    teacher_id: int
+    attendance: List[AttendanceInputItem]
+
+
 class AttendanceUpdate(BaseModel):
     teacher_id: Optional[int] = None
     student_id: Optional[int] = None
@@ -293,6 +486,59 @@ class AttendanceUpdate(BaseModel):
     status: Optional[AttendanceEnum] = None
 
 
+class AttendanceSummary(BaseModel):  # StudentDetail/TeacherDetail uchun davomat bo'yicha umumiy hisob
+    present: int = 0
+    absent: int = 0
+    late: int = 0
+    total: int = 0
+
+
+class AttendanceFilter(BaseModel):  # crud.py get_attendances uchun query parametrlar
+    group_id: Optional[int] = None
+    teacher_id: Optional[int] = None
+    student_id: Optional[int] = None
+    subject_id: Optional[int] = None
+    status: Optional[AttendanceEnum] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+
+class AttendanceReportFilter(BaseModel):  # Rollup hisobotlari uchun query parametrlar
+    group_id: Optional[int] = None
+    teacher_id: Optional[int] = None
+    student_id: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    period: ReportPeriodEnum = ReportPeriodEnum.month
+
+
+class AttendanceReportRow(BaseModel):
+    group_id: Optional[int] = None
+    teacher_id: Optional[int] = None
+    student_id: Optional[int] = None
+    period: date  # Kun yoki oyning birinchi kuni
+    present: int
+    absent: int
+    late: int
+    total: int
+    rate: float  # (present + late) / total
+
+
+class AtRiskStudent(BaseModel):  # Ketma-ket dars qoldirayotgan student (ota-onasiga qo'ng'iroq qilish uchun)
+    student_id: int
+    student_firstname: str
+    student_lastname: str
+    student_parents_fullname: str
+    student_parents_phone_number: str
+    group_id: int
+    group_name: str
+    current_absences: int
+    last_attendance_date: date
+
+    class Config:
+        from_attributes = True
+
+
 class AttendancesOutput(BaseModel):
     id: int
     student: StudentAttendance
@@ -394,6 +640,18 @@ class UserDetail(BaseModel):
     class Config:
         from_attributes = True
 
+class AuthenticatedUser(BaseModel):
+    # verify_token keshida saqlanadigan foydalanuvchi nusxasi (parol va tokenlarsiz)
+    id: int
+    username: str
+    user_email: Optional[str] = None
+    role: RoleEnum
+    teacher_id: Optional[int] = None
+    admin_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
 class UserUpdate(BaseModel):
     username: Optional[str] = None
     user_email: Optional[str] = None
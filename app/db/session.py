@@ -1,19 +1,99 @@
+from functools import lru_cache
+from typing import Union
+
+from pydantic import TypeAdapter
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_options
 
 # PostgreSQL bazasi bilan bog‘lanish uchun SQLAlchemy engine yaratamiz
 DATABASE_URL = settings.DATABASE_URL
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options())
 
 # SessionLocal - Har bir so‘rov uchun yangi sessiya yaratish
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 session = SessionLocal()
 
+# Async rejim (DB_ASYNC=true): so'rovlar threadpool o'rniga event loop ustida asyncpg orqali bajariladi
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    async_engine = create_async_engine(settings.async_database_url,
+                                       poolclass=InstrumentedAsyncQueuePool, **pool_options())
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+DbSession = Union[Session, AsyncSession]
+
 
 def get_db():  # Har bir so‘rov uchun alohida sessiya yaratish va yopish
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()  # So‘rov tugagach sessiya yopiladi
\ No newline at end of file
+        db.close()  # So‘rov tugagach sessiya yopiladi
+
+
+async def get_session():  # Routerlar uchun: sozlamaga qarab AsyncSession yoki oddiy Session
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        await run_in_threadpool(db.close)
+
+
+def offload(fn, *args, **kwargs):
+    """
+    crud ichidagi CPU-bound ishni (CSV o'qish va parse, pydantic validatsiya, xotiradagi moslash) bajaradi.
+    DB_ASYNC rejimida crud funksiyasi run_sync orqali event loop thread'ida ishlaydi - bu yerda ish
+    threadpool'ga uzatiladi va loop shu vaqtda boshqa so'rovlarga xizmat qiladi. Sync rejimda crud
+    allaqachon threadpool'da, shuning uchun fn to'g'ridan-to'g'ri chaqiriladi.
+    fn sessiyaga murojaat qilmasligi kerak: async sessiya faqat run_sync greenlet'idan ishlaydi.
+    """
+    if in_greenlet():
+        return await_only(run_in_threadpool(fn, *args, **kwargs))
+    return fn(*args, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+async def run_db(db: DbSession, fn, *args, schema=None, **kwargs):
+    """
+    crud.py funksiyalarining async versiyasi: AsyncSession bo'lsa funksiya `run_sync` orqali
+    asyncpg ulanishida (thread band qilmasdan), aks holda threadpool'da bajariladi.
+    Funksiya birinchi argument sifatida sessiyani oladi.
+
+    schema berilsa (odatda endpointning response_model i) ORM natija shu yerning o'zida, sessiya
+    ishlayotgan thread/run_sync ichida pydantic modelga aylantiriladi. Aks holda FastAPI uni event
+    loop'da serializatsiya qiladi va yuklanmagan relationship yoki commit'dan keyin expire bo'lgan
+    atribut uchun sync sessiya loop'ni bloklab SQL yuboradi (AsyncSession'da esa MissingGreenlet).
+    None o'zgarishsiz qaytadi, 404 ni chaqiruvchi tekshiradi.
+    Validatsiya relationship'larni sessiya orqali yuklashi mumkin, shuning uchun u run_sync ichida qoladi;
+    sessiyaga tegmaydigan og'ir ishlar (import fayllarini parse qilish) crud ichida offload() bilan
+    threadpool'ga chiqariladi.
+    """
+    if schema is not None:
+        adapter, call = _adapter(schema), fn
+
+        def validated(session, *call_args, **call_kwargs):
+            result = call(session, *call_args, **call_kwargs)
+            return None if result is None else adapter.validate_python(result, from_attributes=True)
+
+        fn = validated
+
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda sync_db: fn(sync_db, *args, **kwargs))
+    return await run_in_threadpool(fn, db, *args, **kwargs)
@@ -0,0 +1,29 @@
+from typing import Iterable, Union
+
+from sqlalchemy import SelectBase, func, update
+from sqlalchemy.orm import Session
+
+
+"""
+Bog'langan yozuvlar o'zgarganda ota yozuvning updated_at ini yangilash.
+Detail javoblari (StudentDetail, GroupDetail, ...) bog'lanishlar va ichki yozuvlarni ham o'z ichiga oladi,
+lekin bog'lanish qatorining o'chirilishi yoki ichki yozuvning o'chirilishi hech bir max(updated_at) ni
+siljitmaydi. Shuning uchun bunday o'zgarishlarda ota yozuv shu tranzaksiya ichida "touch" qilinadi -
+shunda ETag ham, Last-Modified ham o'zgaradi. Commit chaqiruvchi tomonidan qilinadi.
+"""
+
+
+def touch(db: Session, model, ids: Union[Iterable[int], SelectBase]):
+    """
+    model.updated_at = now() - ids: id lar ro'yxati yoki id qaytaradigan select.
+    Select bilan chaqirilsa, u cascade o'chirishdan oldin bajarilishi kerak.
+    """
+    if not isinstance(ids, SelectBase):
+        ids = {row_id for row_id in ids if row_id is not None}
+        if not ids:
+            return
+
+    db.execute(
+        update(model).where(model.id.in_(ids)).values(updated_at=func.now()),
+        execution_options={"synchronize_session": False}
+    )
@@ -7,4 +7,16 @@ class AttendanceEnum(Enum):
 
 class RoleEnum(str, Enum):
     admin = "admin"
-    teacher = "teacher"
\ No newline at end of file
+    teacher = "teacher"
+
+class SortOrderEnum(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+class ReportPeriodEnum(str, Enum):
+    day = "day"
+    month = "month"
+
+class BatchModeEnum(str, Enum):
+    atomic = "atomic"  # Bitta xato bo'lsa hech narsa saqlanmaydi
+    best_effort = "best_effort"  # Xato elementlar o'tkazib yuboriladi
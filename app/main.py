@@ -1,4 +1,8 @@
+from anyio import to_thread
 from fastapi import FastAPI, Request
+from app.core.config import settings
+from app.db.crud import load_revoked_tokens
+from app.db.session import SessionLocal
 from app.api.v1.routers_teachers import teacher_router as teacher
 from app.api.v1.routers_students import student_router as student
 from app.api.v1.routers_groups import groups_router as group
@@ -8,6 +12,9 @@ from app.api.v1.routers_subjects import subject_router as subject
 from app.api.v1.router_admins import admin_router as admin
 from app.api.v1.router_user import user_router as user
 from app.api.v1.router_authentication import authentication_router as registration
+from app.api.v1.router_monitoring import monitoring_router as monitoring
+from app.api.v1.routers_reports import reports_router as reports
+from app.api.v1.routers_search import search_router as search
 app = FastAPI(title="My Project API", version="1.0")
 
 routers = [
@@ -19,12 +26,31 @@ routers = [
     (payment, "Payment"),
     (admin, "Admin"),
     (user, "User"),
-    (registration, "Registration")
+    (registration, "Registration"),
+    (monitoring, "Monitoring"),
+    (reports, "Reports"),
+    (search, "Search")
 ]
 
 for router, tag in routers:
     app.include_router(router, prefix="/api/v1", tags=[tag])
 
+@app.on_event("startup")
+async def configure_threadpool():
+    # Sync ishlar uchun threadlar soni DB pool sig'imiga teng qilinadi
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+
+
+@app.on_event("startup")
+async def load_revoked_access_tokens():
+    # Access token tekshiruvi bazaga murojaat qilmasligi uchun bekor qilingan jti lar xotiraga olinadi
+    def load():
+        with SessionLocal() as db:
+            return load_revoked_tokens(db)
+
+    await to_thread.run_sync(load)
+
+
 @app.get("/")
 def main_page():
     return "MAIN PAGE OF GLOBAL SCHOOL ADMIN PANEL "
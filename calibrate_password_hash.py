@@ -0,0 +1,53 @@
+import sys
+import time
+
+from passlib.hash import bcrypt
+
+"""
+Server uchun bcrypt cost (BCRYPT_ROUNDS) ni tanlaydi: parolni tekshirish vaqti maqsadli
+millisekunddan oshmaydigan eng katta cost olinadi va .env faylga yoziladi.
+Ishlatish: python calibrate_password_hash.py [maqsad_ms]   (standart: 250 ms)
+Eski cost bilan saqlangan parollar foydalanuvchi keyingi safar login qilganda qayta hash qilinadi.
+"""
+
+target_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 250
+env_file = ".env"
+samples = 3
+
+
+def measure(rounds: int) -> float:  # Bitta verify ning o'rtacha vaqti (ms)
+    hashed = bcrypt.using(rounds=rounds).hash("calibration-password")
+    started = time.perf_counter()
+    for _ in range(samples):
+        bcrypt.verify("calibration-password", hashed)
+    return (time.perf_counter() - started) / samples * 1000
+
+
+chosen = 10  # OWASP tavsiya qilgan minimal qiymat
+for rounds in range(10, 18):
+    elapsed = measure(rounds)
+    print(f"rounds={rounds}: {elapsed:.1f} ms")
+    if elapsed > target_ms:
+        break
+    chosen = rounds
+
+# Avval mavjud .env faylni o‘qib olamiz
+try:
+    with open(env_file, "r") as f:
+        lines = f.readlines()
+except FileNotFoundError:
+    lines = []
+
+env_vars = {}
+for line in lines:
+    key_value = line.strip().split("=", 1)
+    if len(key_value) == 2:
+        env_vars[key_value[0]] = key_value[1]
+
+env_vars["BCRYPT_ROUNDS"] = str(chosen)
+
+with open(env_file, "w") as f:
+    for key, value in env_vars.items():
+        f.write(f"{key}={value}\n")
+
+print(f"BCRYPT_ROUNDS={chosen} (maqsad {target_ms:.0f} ms) .env faylga saqlandi")